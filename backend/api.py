@@ -7,12 +7,12 @@ import threading
 from pathlib import Path
 
 import requests
+import numpy as np
 import pandas as pd
-import math
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from yfinance.exceptions import YFRateLimitError
 
@@ -27,8 +27,21 @@ from backend.tools import (
     download_prices,
     get_sp500_screener,
 )
-from backend.ml import get_available_models, run_ml_model, start_ml_cache_scheduler
-from backend.macro import get_macro_feature_specs, get_macro_frame, warm_macro_cache
+from backend.ml import (
+    ML_SCENARIO_MAX_PATHS,
+    ML_STRATEGIES,
+    get_available_models,
+    get_ml_singleflight_stats,
+    get_ml_warm_stats,
+    record_ml_request,
+    request_ml_warm,
+    run_ml_model,
+    start_ml_cache_scheduler,
+)
+from backend.budget import TrainingBusy, get_training_budget_stats
+from backend.jobs import JobPoolUnavailable, JobQueueFull, get_ml_job, iter_ml_job_events, submit_ml_job
+from backend.macro import get_macro_feature_specs, get_macro_frame, get_macro_version, warm_macro_cache
+from backend.registry import get_registry_stats
 
 
 app = FastAPI()
@@ -54,6 +67,11 @@ NEWS_CACHE_TTL = 300
 NEWS_CACHE: dict[str, tuple[float, list]] = {}
 AUTOCOMPLETE_CACHE_TTL = 180
 AUTOCOMPLETE_CACHE: dict[str, tuple[float, dict]] = {}
+MACRO_DATA_CACHE_MAX_ENTRIES = 128
+MACRO_DATA_CACHE: dict[tuple, dict] = {}
+# Server-side downsampling for /macro/data (period-end sample of each series,
+# dated by the bucket's last observation rather than the calendar period end).
+MACRO_RESOLUTIONS = {"daily": None, "weekly": "W-FRI", "monthly": "ME"}
 
 
 class WatchlistBatchRequest(BaseModel):
@@ -64,6 +82,26 @@ class WatchlistConfigRequest(BaseModel):
     tickers: list[str]
 
 
+class MlJobRequest(BaseModel):
+    ticker: str
+    period: str = "1y"
+    interval: str = "1d"
+    model: str = "XGBoost"
+    pre_days: int = 10
+    test_days: int = 10
+    ma1: int = 50
+    ma2: int = 150
+    ema1: int = 50
+    arima_order: str = "5,1,0"
+    scaler_type: str = "standard"
+    features: str | None = None
+    refresh: bool = False
+    deadline_ms: int | None = None
+    strategy: str = "recursive"
+    scenarios: int = 0
+    pooled: bool = False
+
+
 @app.get("/autocomplete")
 def yahoo_autocomplete(q: str):
     try:
@@ -290,6 +328,7 @@ def set_watchlist_config(payload: WatchlistConfigRequest):
             data = {}
         data["watchlist"] = watchlist
         config_path.write_text(json.dumps(data, indent=2))
+        request_ml_warm()
         return {"watchlist": watchlist}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -309,50 +348,64 @@ def macro_series():
     return {"series": get_macro_feature_specs()}
 
 
+def _serialize_macro_frame(df: pd.DataFrame) -> dict:
+    values = df.to_numpy(dtype=float)
+    cells = values.astype(object)
+    cells[~np.isfinite(values)] = None
+    payload = {"Date": df.index.astype(str).tolist()}
+    for idx, col in enumerate(df.columns):
+        payload[col] = cells[:, idx].tolist()
+    return payload
+
+
+def _macro_data_payload(keys: tuple[str, ...], start: str | None, end: str | None, resolution: str, refresh: bool) -> dict:
+    df = get_macro_frame(force=refresh)
+    if df.empty:
+        return {"data": {}}
+    cache_key = (get_macro_version(), keys, start, end, resolution)
+    cached = MACRO_DATA_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+    if keys:
+        df = df[[k for k in keys if k in df.columns]]
+        if df.empty and not refresh:
+            return _macro_data_payload(keys, start, end, resolution, refresh=True)
+    if start:
+        start_dt = pd.to_datetime(start, errors="coerce")
+        if pd.notnull(start_dt):
+            df = df[df.index >= start_dt]
+    if end:
+        end_dt = pd.to_datetime(end, errors="coerce")
+        if pd.notnull(end_dt):
+            df = df[df.index <= end_dt]
+    rule = MACRO_RESOLUTIONS[resolution]
+    if rule and not df.empty:
+        # A period-end label can fall after `end` (or today) and read as future data.
+        last_seen = df.index.to_series().resample(rule).last()
+        df = df.resample(rule).last()
+        df.index = pd.DatetimeIndex(last_seen.to_numpy(), name=df.index.name)
+        df = df[df.index.notna()]
+    payload = {"data": _serialize_macro_frame(df) if not df.empty else {}}
+    if len(MACRO_DATA_CACHE) >= MACRO_DATA_CACHE_MAX_ENTRIES:
+        MACRO_DATA_CACHE.clear()
+    MACRO_DATA_CACHE[cache_key] = payload
+    return payload
+
+
 @app.get("/macro/data")
-def macro_data(start: str | None = None, end: str | None = None, keys: str | None = None, refresh: bool = False):
+def macro_data(
+    start: str | None = None,
+    end: str | None = None,
+    keys: str | None = None,
+    refresh: bool = False,
+    resolution: str = "daily",
+):
+    resolution = (resolution or "daily").lower().strip()
+    if resolution not in MACRO_RESOLUTIONS:
+        raise HTTPException(400, f"Invalid resolution; choose one of {', '.join(MACRO_RESOLUTIONS)}.")
+    requested = tuple(k.strip() for k in (keys or "").split(",") if k.strip())
     try:
-        df = get_macro_frame(force=refresh)
-        if df.empty:
-            return {"data": {}}
-        if keys:
-            requested = [k.strip() for k in keys.split(",") if k.strip()]
-            if requested:
-                df = df[[k for k in requested if k in df.columns]]
-                if df.empty and not refresh:
-                    df = get_macro_frame(force=True)
-                    df = df[[k for k in requested if k in df.columns]]
-        if start:
-            start_dt = pd.to_datetime(start, errors="coerce")
-            if pd.notnull(start_dt):
-                df = df[df.index >= start_dt]
-        if end:
-            end_dt = pd.to_datetime(end, errors="coerce")
-            if pd.notnull(end_dt):
-                df = df[df.index <= end_dt]
-        if df.empty:
-            return {"data": {}}
-        df = df.replace([float("inf"), float("-inf")], pd.NA)
-        df = df.where(pd.notnull(df), None)
-        payload = {"Date": df.index.astype(str).tolist()}
-
-        def _clean_list(values: list):
-            cleaned = []
-            for val in values:
-                if val is None:
-                    cleaned.append(None)
-                elif isinstance(val, (float, int)):
-                    if isinstance(val, float) and (math.isnan(val) or math.isinf(val)):
-                        cleaned.append(None)
-                    else:
-                        cleaned.append(float(val))
-                else:
-                    cleaned.append(val)
-            return cleaned
-
-        for col in df.columns:
-            payload[col] = _clean_list(df[col].tolist())
-        return {"data": payload}
+        return _macro_data_payload(requested, start, end, resolution, refresh)
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
@@ -400,32 +453,57 @@ def ml_models():
     return get_available_models()
 
 
-@app.get("/ml/{ticker}")
-def ml_predictions(
+@app.get("/ml/stats")
+def ml_stats():
+    return {
+        "singleflight": get_ml_singleflight_stats(),
+        "registry": get_registry_stats(),
+        "warm": get_ml_warm_stats(),
+        "budget": get_training_budget_stats(),
+    }
+
+
+def _ml_params(
     ticker: str,
-    period: str = "1y",
-    interval: str = "1d",
-    model: str = "XGBoost",
-    pre_days: int = 10,
-    test_days: int = 10,
-    ma1: int = 50,
-    ma2: int = 150,
-    ema1: int = 50,
-    arima_order: str = "5,1,0",
-    scaler_type: str = "standard",
-    features: str | None = None,
-    refresh: bool = False,
-):
+    period: str,
+    interval: str,
+    model: str,
+    pre_days: int,
+    test_days: int,
+    ma1: int,
+    ma2: int,
+    ema1: int,
+    arima_order: str,
+    scaler_type: str,
+    features: str | None,
+    refresh: bool,
+    deadline_ms: int | None,
+    strategy: str = "recursive",
+    scenarios: int = 0,
+    pooled: bool = False,
+) -> dict:
+    """Validate /ml request parameters into `run_ml_model` keyword arguments."""
     # Normalize inputs for yfinance
     period = (period or "").lower().strip()
     interval = (interval or "").lower().strip()
     yf_period = get_extended_period(period, interval)
 
-    # Parse ARIMA order
-    try:
-        order = tuple(int(x) for x in arima_order.split(","))
-    except Exception:
-        raise HTTPException(400, "Invalid arima_order; must be 'p,d,q'.")
+    # Parse ARIMA order ("auto" searches for one by AIC)
+    if arima_order.strip().lower() == "auto":
+        order = "auto"
+    else:
+        try:
+            order = tuple(int(x) for x in arima_order.split(","))
+        except Exception:
+            raise HTTPException(400, "Invalid arima_order; must be 'p,d,q' or 'auto'.")
+
+    strategy = (strategy or "").lower().strip()
+    if strategy not in ML_STRATEGIES:
+        raise HTTPException(400, f"Invalid strategy; must be one of {', '.join(ML_STRATEGIES)}.")
+    if not 0 <= scenarios <= ML_SCENARIO_MAX_PATHS:
+        raise HTTPException(400, f"Invalid scenarios; must be between 0 and {ML_SCENARIO_MAX_PATHS}.")
+    if pooled and scenarios:
+        raise HTTPException(400, "Scenario bands are not available for pooled models.")
 
     # Parse and validate feature flags (ARIMA doesn't require them)
     flags = {}
@@ -445,32 +523,113 @@ def ml_predictions(
             except json.JSONDecodeError:
                 flags = {}
 
+    params = {
+        "ticker": ticker,
+        "period": yf_period,
+        "interval": interval,
+        "model_type": model,
+        "pre_days": pre_days,
+        "test_days": test_days,
+        "ma1": ma1,
+        "ma2": ma2,
+        "ema1": ema1,
+        "arima_order": order,
+        "scaler_type": scaler_type,
+        "feature_flags": flags,
+        "use_cache": not refresh,
+        "deadline_ms": deadline_ms,
+        "strategy": strategy,
+        "scenarios": scenarios,
+        "pooled": pooled,
+    }
+    # Feeds the warm scheduler's view of which configurations are requested
+    record_ml_request(params)
+    return params
+
+
+@app.post("/ml/jobs")
+def create_ml_job(payload: MlJobRequest):
+    """Enqueue a forecast on the ML job pool; poll /ml/jobs/{id} or stream /ml/jobs/{id}/events."""
+    params = _ml_params(**payload.model_dump())
+    try:
+        return submit_ml_job(params)
+    except (JobQueueFull, JobPoolUnavailable) as e:
+        raise HTTPException(503, str(e))
+
+
+@app.get("/ml/jobs/{job_id}")
+def ml_job_status(job_id: str):
+    job = get_ml_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown ML job.")
+    return job
+
+
+@app.get("/ml/jobs/{job_id}/events")
+def ml_job_events(job_id: str):
+    if get_ml_job(job_id) is None:
+        raise HTTPException(404, "Unknown ML job.")
+    return StreamingResponse(
+        iter_ml_job_events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
+
+@app.get("/ml/{ticker}")
+def ml_predictions(
+    ticker: str,
+    period: str = "1y",
+    interval: str = "1d",
+    model: str = "XGBoost",
+    pre_days: int = 10,
+    test_days: int = 10,
+    ma1: int = 50,
+    ma2: int = 150,
+    ema1: int = 50,
+    arima_order: str = "5,1,0",
+    scaler_type: str = "standard",
+    features: str | None = None,
+    refresh: bool = False,
+    deadline_ms: int | None = None,
+    strategy: str = "recursive",
+    scenarios: int = 0,
+    pooled: bool = False,
+):
+    params = _ml_params(
+        ticker,
+        period,
+        interval,
+        model,
+        pre_days,
+        test_days,
+        ma1,
+        ma2,
+        ema1,
+        arima_order,
+        scaler_type,
+        features,
+        refresh,
+        deadline_ms,
+        strategy,
+        scenarios,
+        pooled,
+    )
+
     # Retry loop on Yahoo rate-limit
     max_retries = 3
     backoff = 0.5
     for attempt in range(max_retries):
         try:
-            return run_ml_model(
-                ticker=ticker,
-                period=yf_period,
-                interval=interval,
-                model_type=model,
-                pre_days=pre_days,
-                test_days=test_days,
-                ma1=ma1,
-                ma2=ma2,
-                ema1=ema1,
-                arima_order=order,
-                scaler_type=scaler_type,
-                feature_flags=flags,
-                use_cache=not refresh,
-            )
+            return run_ml_model(**params)
         except YFRateLimitError:
             if attempt < max_retries - 1:
                 time.sleep(backoff)
                 backoff *= 2
                 continue
             raise HTTPException(503, "Rate limit exceeded; try again shortly.")
+        except TrainingBusy as e:
+            raise HTTPException(503, str(e))
         except ValueError as e:
             raise HTTPException(400, detail=str(e))
         except Exception as e:
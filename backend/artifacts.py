@@ -0,0 +1,61 @@
+# backend/artifacts.py
+
+from __future__ import annotations
+
+import json
+import queue
+import threading
+from pathlib import Path
+from threading import Lock
+
+import numpy as np
+
+# Training artifacts (design matrices, projection traces) for debugging a
+# forecast. Off by default. When enabled, a background thread writes each run
+# to its own directory as compressed .npz, so the ML request path does no I/O.
+ML_ARTIFACTS_ENABLED = False
+ML_ARTIFACTS_DIR = Path(__file__).resolve().parent / "output" / "artifacts"
+ML_ARTIFACTS_MAX_PENDING = 32  # runs queued beyond this are dropped, not blocked on
+
+_QUEUE: queue.Queue | None = None
+_QUEUE_LOCK = Lock()
+
+
+def artifacts_enabled() -> bool:
+    return ML_ARTIFACTS_ENABLED
+
+
+def _ensure_writer() -> queue.Queue:
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = queue.Queue(maxsize=ML_ARTIFACTS_MAX_PENDING)
+            threading.Thread(target=_write_artifacts, args=(_QUEUE,), daemon=True).start()
+        return _QUEUE
+
+
+def _write_artifacts(pending: queue.Queue):
+    while True:
+        run_id, meta, arrays = pending.get()
+        try:
+            run_dir = ML_ARTIFACTS_DIR / run_id
+            run_dir.mkdir(parents=True, exist_ok=True)
+            np.savez_compressed(run_dir / "artifacts.npz", **arrays)
+            (run_dir / "meta.json").write_text(json.dumps(meta, default=str))
+        except Exception as e:
+            print(f"Artifact write failed for {run_id}: {e}")
+
+
+def save_artifacts(run_id: str, meta: dict, **arrays):
+    """
+    Queue `arrays` and `meta` for run `run_id`; a no-op unless artifacts are enabled.
+
+    Arrays are written as-is later, so callers must not mutate them afterwards.
+    """
+    if not ML_ARTIFACTS_ENABLED:
+        return
+    arrays = {name: np.asarray(value) for name, value in arrays.items() if value is not None}
+    try:
+        _ensure_writer().put_nowait((run_id, meta, arrays))
+    except queue.Full:
+        pass
@@ -0,0 +1,185 @@
+# backend/budget.py
+
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Callable
+
+from threadpoolctl import threadpool_limits
+
+# CPU budget for model training on this host. Forecasts run on the API
+# threadpool, warm-up threads and job processes at once, and XGBoost, OpenMP
+# and BLAS would each size themselves to every core. At most
+# ML_TRAINING_SLOTS trainings run together, each with ML_TRAINING_THREADS
+# threads; processes that train split the slots between them (see
+# split_training_slots). Interactive trainings wait in a queue of ML_TRAINING_MAX_QUEUE for
+# up to ML_TRAINING_QUEUE_TIMEOUT seconds (or their deadline) and are shed with
+# TrainingBusy beyond that; background warm-ups wait behind them, unbounded.
+ML_TRAINING_SLOTS = max(1, (os.cpu_count() or 1) // 2)
+ML_TRAINING_THREADS = max(1, (os.cpu_count() or 1) // ML_TRAINING_SLOTS)
+ML_TRAINING_MAX_QUEUE = 8
+ML_TRAINING_QUEUE_TIMEOUT = 30.0
+ML_TRAINING_HISTORY = 200  # finished trainings kept for the queue/run time stats
+
+_BUDGET_COND = Condition(Lock())
+_WAITING: dict[bool, deque] = {False: deque(), True: deque()}  # background? -> waiting tickets
+_RUNNING = {"count": 0}
+_SLOTS = {"process": ML_TRAINING_SLOTS}  # this process's share of ML_TRAINING_SLOTS
+_BUDGET_STATS = {"admitted": 0, "shed": 0}
+_HISTORY: deque[dict] = deque(maxlen=ML_TRAINING_HISTORY)
+_NATIVE_LIMITS = {"applied": False}
+
+
+class TrainingBusy(RuntimeError):
+    pass
+
+
+def _limit_native_threads():
+    # OpenMP/BLAS pools are process-wide, so they are capped once rather than
+    # per training: restoring a scoped limit would lift it for the others.
+    if not _NATIVE_LIMITS["applied"]:
+        threadpool_limits(limits=ML_TRAINING_THREADS)
+        _NATIVE_LIMITS["applied"] = True
+
+
+def split_training_slots(workers: int) -> tuple[int, int]:
+    """
+    Give up to `workers` child processes a share of this process's slots.
+
+    Returns (processes, share): start `processes` children and pass `share` to
+    set_training_slots in each; this process keeps the rest, at least one.
+    With fewer than two slots there is nothing to hand out and (0, 0) is
+    returned: run the work on threads here, queueing for the same slots.
+    """
+    with _BUDGET_COND:
+        slots = _SLOTS["process"]
+        processes = min(workers, slots - 1)
+        if processes <= 0:
+            return 0, 0
+        share = slots // (processes + 1)
+        _SLOTS["process"] = slots - processes * share
+        return processes, share
+
+
+def set_training_slots(slots: int):
+    """Process-pool initializer: train with `slots` of the host's slots."""
+    with _BUDGET_COND:
+        _SLOTS["process"] = max(1, slots)
+        _BUDGET_COND.notify_all()
+
+
+def _admissible(ticket: object, background: bool) -> bool:
+    if _RUNNING["count"] >= _SLOTS["process"]:
+        return False
+    if background:
+        return not _WAITING[False] and _WAITING[True][0] is ticket
+    return _WAITING[False][0] is ticket
+
+
+def _record(label: str, background: bool, queued: float, ran: float | None, outcome: str):
+    _HISTORY.append(
+        {
+            "label": label,
+            "background": background,
+            "queued_ms": round(queued * 1000.0, 1),
+            "run_ms": round(ran * 1000.0, 1) if ran is not None else None,
+            "outcome": outcome,
+            "finished": time.time(),
+        }
+    )
+
+
+@contextmanager
+def training_slot(
+    label: str,
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+    background: bool = False,
+):
+    """
+    Hold one of this process's training slots for the duration of a training.
+
+    Waiters are admitted first come, first served, interactive before
+    background. Yields {"threads", "queued_ms"}; `run_ms` is filled in on exit.
+    Raises TrainingBusy when the queue is full or the wait outlasts
+    ML_TRAINING_QUEUE_TIMEOUT or `deadline` (wall clock, as in backend.ml).
+    """
+    ticket = object()
+    waiting = _WAITING[background]
+    requested = time.monotonic()
+    with _BUDGET_COND:
+        if not background and len(waiting) >= ML_TRAINING_MAX_QUEUE:
+            _BUDGET_STATS["shed"] += 1
+            _record(label, background, 0.0, None, "shed")
+            raise TrainingBusy("Too many models training; try again shortly.")
+        waiting.append(ticket)
+        give_up = None if background else requested + ML_TRAINING_QUEUE_TIMEOUT
+        if deadline is not None and not background:
+            give_up = min(give_up, requested + max(0.0, deadline - time.time()))
+        try:
+            while not _admissible(ticket, background):
+                if progress:
+                    ahead = waiting.index(ticket) + (len(_WAITING[False]) if background else 0)
+                    progress({"stage": "queued", "position": ahead + 1, "running": _RUNNING["count"]})
+                remaining = None if give_up is None else give_up - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    _BUDGET_STATS["shed"] += 1
+                    _record(label, background, time.monotonic() - requested, None, "shed")
+                    raise TrainingBusy("Timed out waiting for a training slot; try again shortly.")
+                _BUDGET_COND.wait(timeout=remaining)
+        finally:
+            waiting.remove(ticket)
+            _BUDGET_COND.notify_all()
+        _RUNNING["count"] += 1
+        _BUDGET_STATS["admitted"] += 1
+        _limit_native_threads()
+
+    started = time.monotonic()
+    slot = {"threads": ML_TRAINING_THREADS, "queued_ms": round((started - requested) * 1000.0, 1)}
+    outcome = "failed"
+    try:
+        yield slot
+        outcome = "done"
+    finally:
+        ran = time.monotonic() - started
+        slot["run_ms"] = round(ran * 1000.0, 1)
+        with _BUDGET_COND:
+            _RUNNING["count"] -= 1
+            _record(label, background, started - requested, ran, outcome)
+            _BUDGET_COND.notify_all()
+
+
+def _summary(values: list[float]) -> dict | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "mean": round(sum(ordered) / len(ordered), 1),
+        "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "max": ordered[-1],
+    }
+
+
+def get_training_budget_stats() -> dict:
+    with _BUDGET_COND:
+        history = list(_HISTORY)
+        stats = {
+            "slots": _SLOTS["process"],
+            "host_slots": ML_TRAINING_SLOTS,
+            "threads": ML_TRAINING_THREADS,
+            "max_queue": ML_TRAINING_MAX_QUEUE,
+            "running": _RUNNING["count"],
+            "queued": len(_WAITING[False]),
+            "queued_background": len(_WAITING[True]),
+            **_BUDGET_STATS,
+        }
+    ran = [entry for entry in history if entry["run_ms"] is not None]
+    return stats | {
+        "queued_ms": _summary([entry["queued_ms"] for entry in history]),
+        "run_ms": _summary([entry["run_ms"] for entry in ran]),
+        "recent": history[-20:],
+    }
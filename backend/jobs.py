@@ -0,0 +1,299 @@
+# backend/jobs.py
+
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Condition, Lock
+
+from yfinance.exceptions import YFRateLimitError
+
+from backend.budget import TrainingBusy, set_training_slots, split_training_slots
+from backend.ml import _cache_get, _cache_key, _cache_set, run_ml_model
+
+ML_JOB_WORKERS = 2
+ML_JOB_MAX_PENDING = 16  # queued + running jobs before new submissions are refused
+ML_JOB_TTL = 60 * 60  # finished jobs are kept this long for polling
+ML_JOB_KEEPALIVE_SECONDS = 15.0
+ML_JOB_EVENTS_POLL_SECONDS = 0.25  # SSE streams poll job state; they hold no thread while idle
+
+ACTIVE_STATUSES = ("queued", "running")
+_FINISHED = "__finished__"
+
+_JOBS: dict[str, dict] = {}
+_JOB_KEYS: dict[tuple, str] = {}  # ML cache key -> in-flight job id
+_JOBS_COND = Condition(Lock())
+
+_EXECUTOR: ProcessPoolExecutor | ThreadPoolExecutor | None = None
+_PROGRESS_QUEUE = None
+_JOB_POOL: tuple[int, int] | None = None  # (job processes, training slots each) from split_training_slots
+_EXECUTOR_LOCK = Lock()
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class JobPoolUnavailable(RuntimeError):
+    pass
+
+
+def _run_ml_job(job_id: str, params: dict, queue) -> dict:
+    """Job-process entry point: run the forecast, streaming progress to `queue`."""
+
+    def _progress(event: dict):
+        queue.put((job_id, event))
+
+    queue.put((job_id, {"stage": "started"}))
+    max_retries = 3
+    backoff = 0.5
+    for attempt in range(max_retries):
+        try:
+            return run_ml_model(**params, progress=_progress, run_id=job_id)
+        except YFRateLimitError:
+            if attempt < max_retries - 1:
+                queue.put((job_id, {"stage": "rate_limited", "retry_in": backoff}))
+                time.sleep(backoff)
+                backoff *= 2
+                continue
+            raise RuntimeError("Rate limit exceeded; try again shortly.")
+        except TrainingBusy as e:
+            raise RuntimeError(str(e))
+        except ValueError as e:
+            # Re-raise as a plain ValueError so it pickles back to the API process.
+            raise ValueError(str(e))
+        except Exception as e:
+            traceback.print_exc()
+            raise RuntimeError(f"ML Error: {e}")
+
+
+def _ensure_executor():
+    global _EXECUTOR, _PROGRESS_QUEUE, _JOB_POOL
+    with _EXECUTOR_LOCK:
+        ctx = multiprocessing.get_context("spawn")
+        if _PROGRESS_QUEUE is None:
+            _PROGRESS_QUEUE = ctx.Manager().Queue()
+            threading.Thread(target=_drain_progress, args=(_PROGRESS_QUEUE,), daemon=True).start()
+        if _JOB_POOL is None:
+            _JOB_POOL = split_training_slots(ML_JOB_WORKERS)
+        if _EXECUTOR is None:
+            processes, slots = _JOB_POOL
+            if processes:
+                _EXECUTOR = ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=ctx,
+                    initializer=set_training_slots,
+                    initargs=(slots,),
+                )
+            else:
+                # No slot to spare for a job process: jobs share this process's budget
+                _EXECUTOR = ThreadPoolExecutor(max_workers=ML_JOB_WORKERS, thread_name_prefix="ml-job")
+        return _EXECUTOR, _PROGRESS_QUEUE
+
+
+def _reset_executor(broken: ProcessPoolExecutor | ThreadPoolExecutor):
+    """Drop `broken` (a pool that lost a worker) so the next submission starts a fresh one."""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is broken:
+            _EXECUTOR = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(job_id: str, params: dict):
+    """Submit a job, replacing the pool once if a dead worker broke it."""
+    for attempt in range(2):
+        executor, queue = _ensure_executor()
+        try:
+            future = executor.submit(_run_ml_job, job_id, params, queue)
+        except (BrokenProcessPool, RuntimeError):
+            # RuntimeError: the pool was shut down by a concurrent reset
+            _reset_executor(executor)
+            if attempt:
+                raise
+            continue
+        return future, executor, queue
+
+
+def _drain_progress(queue):
+    """Apply progress events from job processes; completion markers arrive in order after them."""
+    while True:
+        try:
+            job_id, event = queue.get()
+        except Exception:
+            return
+        if event == _FINISHED:
+            _finish_job(job_id)
+            continue
+        with _JOBS_COND:
+            job = _JOBS.get(job_id)
+            if job is None:
+                continue
+            if job["status"] == "queued":
+                job["status"] = "running"
+            job["progress"] = event
+            job["events"].append(event)
+            job["updated"] = time.time()
+            _JOBS_COND.notify_all()
+
+
+def _finish_job(job_id: str):
+    with _JOBS_COND:
+        job = _JOBS.get(job_id)
+        if job is None:
+            return
+        future: Future = job["future"]
+    try:
+        payload = future.result()
+        status, error = "done", None
+    except BrokenProcessPool:
+        payload, status, error = None, "failed", "ML worker stopped unexpectedly; try again."
+        _reset_executor(job["executor"])
+    except ValueError as e:
+        payload, status, error = None, "failed", str(e)
+    except Exception as e:
+        payload, status, error = None, "failed", str(e) or e.__class__.__name__
+    if payload is not None and not payload.get("partial"):
+        _cache_set(job["key"], payload)
+    with _JOBS_COND:
+        job.update(status=status, result=payload, error=error, updated=time.time())
+        if _JOB_KEYS.get(job["key"]) == job_id:
+            _JOB_KEYS.pop(job["key"], None)
+        _JOBS_COND.notify_all()
+
+
+def _prune_jobs():
+    cutoff = time.time() - ML_JOB_TTL
+    for job_id in [
+        job_id
+        for job_id, job in _JOBS.items()
+        if job["status"] not in ACTIVE_STATUSES and job["updated"] < cutoff
+    ]:
+        _JOBS.pop(job_id, None)
+
+
+def _snapshot(job: dict) -> dict:
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "result": job["result"],
+        "error": job["error"],
+        "created": job["created"],
+        "updated": job["updated"],
+    }
+
+
+def _new_job(key: tuple, status: str = "queued", result: dict | None = None) -> dict:
+    now = time.time()
+    job = {
+        "id": uuid.uuid4().hex,
+        "key": key,
+        "status": status,
+        "progress": None,
+        "events": [],
+        "result": result,
+        "error": None,
+        "future": None,
+        "executor": None,
+        "created": now,
+        "updated": now,
+    }
+    _JOBS[job["id"]] = job
+    return job
+
+
+def submit_ml_job(params: dict) -> dict:
+    """
+    Enqueue a `run_ml_model` call on the job process pool and return its snapshot.
+
+    Identical in-flight requests (same ML cache key) share one job, and fresh
+    cached results complete immediately without touching the pool.
+    """
+    key = _cache_key(
+        params["ticker"],
+        params["period"],
+        params["interval"],
+        params["model_type"],
+        params["pre_days"],
+        params["test_days"],
+        params["ma1"],
+        params["ma2"],
+        params["ema1"],
+        params["arima_order"],
+        params["scaler_type"],
+        params["feature_flags"],
+        params.get("strategy", "recursive"),
+        params.get("pooled", False),
+        params.get("scenarios", 0),
+    )
+    with _JOBS_COND:
+        _prune_jobs()
+        existing = _JOB_KEYS.get(key)
+        if existing and existing in _JOBS:
+            return _snapshot(_JOBS[existing]) | {"deduplicated": True}
+        if params.get("use_cache", True):
+            cached = _cache_get(key)
+            if cached:
+                return _snapshot(_new_job(key, status="done", result=cached | {"cached": True}))
+        pending = sum(1 for job in _JOBS.values() if job["status"] in ACTIVE_STATUSES)
+        if pending >= ML_JOB_MAX_PENDING:
+            raise JobQueueFull("Too many ML jobs in progress; try again shortly.")
+        job = _new_job(key)
+        _JOB_KEYS[key] = job["id"]
+
+    try:
+        future, executor, queue = _submit(job["id"], params)
+    except Exception as e:
+        # Never leave a job that no worker will run: it would be handed to
+        # identical requests and count against ML_JOB_MAX_PENDING forever.
+        with _JOBS_COND:
+            _JOBS.pop(job["id"], None)
+            if _JOB_KEYS.get(key) == job["id"]:
+                _JOB_KEYS.pop(key, None)
+        raise JobPoolUnavailable("ML workers are unavailable; try again shortly.") from e
+    job_id = job["id"]
+    with _JOBS_COND:
+        job["future"] = future
+        job["executor"] = executor
+    future.add_done_callback(lambda _f: queue.put((job_id, _FINISHED)))
+    return _snapshot(job)
+
+
+def get_ml_job(job_id: str) -> dict | None:
+    with _JOBS_COND:
+        job = _JOBS.get(job_id)
+        return _snapshot(job) if job else None
+
+
+async def iter_ml_job_events(job_id: str):
+    """Server-sent events for a job: one `progress` event per update, then `done`/`failed`."""
+    sent = 0
+    idle_since = time.monotonic()
+    while True:
+        with _JOBS_COND:
+            job = _JOBS.get(job_id)
+            if job is None:
+                return
+            events = job["events"][sent:]
+            sent += len(events)
+            status = job["status"]
+            snapshot = _snapshot(job)
+        for event in events:
+            yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+        if status not in ACTIVE_STATUSES:
+            yield f"event: {status}\ndata: {json.dumps(snapshot)}\n\n"
+            return
+        if events:
+            idle_since = time.monotonic()
+        elif time.monotonic() - idle_since >= ML_JOB_KEEPALIVE_SECONDS:
+            idle_since = time.monotonic()
+            yield ": keep-alive\n\n"
+        await asyncio.sleep(ML_JOB_EVENTS_POLL_SECONDS)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import time
+from collections import OrderedDict
 from io import StringIO
 from pathlib import Path
 from threading import Lock
@@ -147,9 +148,22 @@ DERIVED_FEATURES = [
     }
 ]
 
-_MACRO_CACHE: tuple[float, pd.DataFrame] | None = None
+# Rolling windows (in weekday sessions) for the z-score / pct-from-MA features
+# derived from every `_level` series.
+LEVEL_FEATURE_WINDOWS = (20, 60)
+
+ALIGN_CACHE_MAX_ENTRIES = 64
+
+_MACRO_CACHE: tuple[float, pd.DataFrame, pd.DataFrame] | None = None
+_MACRO_VERSION = 0
 _MACRO_LOCK = Lock()
 
+# Aligned macro frames keyed by (macro version, index fingerprint, lag). Each
+# entry keeps the pre-lag frame too so an index that only appends dates (the
+# recursive projection) can be extended row-by-row instead of realigned.
+_ALIGN_CACHE: "OrderedDict[tuple, tuple[pd.DataFrame, pd.DataFrame]]" = OrderedDict()
+_ALIGN_LOCK = Lock()
+
 
 def get_macro_feature_specs() -> list[dict]:
     return [
@@ -296,38 +310,140 @@ def update_macro_cache(force: bool = False) -> pd.DataFrame:
     return df
 
 
-def get_macro_frame(force: bool = False) -> pd.DataFrame:
-    global _MACRO_CACHE
+def _derive_level_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append rolling z-scores and pct-from-MA for every `_level` column.
+
+    The macro frame is on a calendar-day grid, so the windows are evaluated on
+    weekday rows only (matching trading sessions) and forward-filled over
+    weekends. Computed once per macro build rather than on every alignment.
+    """
+    level_cols = [col for col in df.columns if col.endswith("_level")]
+    if df.empty or not level_cols:
+        return df
+    # Series keep their NaN on market holidays; a hole inside a window would
+    # blank every window spanning it, so carry the last level across it.
+    sessions = df.loc[df.index.dayofweek < 5, level_cols].astype(float).ffill()
+    derived: dict[str, pd.Series] = {}
+    for col in level_cols:
+        series = sessions[col]
+        for window in LEVEL_FEATURE_WINDOWS:
+            rolling_mean = series.rolling(window).mean()
+            rolling_std = series.rolling(window).std()
+            zscore = (series - rolling_mean) / rolling_std
+            derived[f"{col}_z{window}"] = zscore.replace([np.inf, -np.inf], np.nan)
+            pct_from_ma = (series / rolling_mean - 1.0) * 100.0
+            derived[f"{col}_pct_ma{window}"] = pct_from_ma.replace([np.inf, -np.inf], np.nan)
+    derived_df = pd.DataFrame(derived, index=sessions.index).reindex(df.index).ffill()
+    return pd.concat([df, derived_df], axis=1)
+
+
+def _get_macro_cache(force: bool = False) -> tuple[pd.DataFrame, pd.DataFrame, int]:
+    global _MACRO_CACHE, _MACRO_VERSION
     with _MACRO_LOCK:
         if _MACRO_CACHE and not force:
-            ts, df = _MACRO_CACHE
+            ts, df, features = _MACRO_CACHE
             if time.time() - ts < MACRO_CACHE_TTL:
-                return df
+                return df, features, _MACRO_VERSION
     cached = update_macro_cache(force=force)
+    features = _derive_level_features(cached)
     with _MACRO_LOCK:
-        _MACRO_CACHE = (time.time(), cached)
-    return cached
+        _MACRO_CACHE = (time.time(), cached, features)
+        _MACRO_VERSION += 1
+        version = _MACRO_VERSION
+    with _ALIGN_LOCK:
+        _ALIGN_CACHE.clear()
+    return cached, features, version
+
+
+def get_macro_frame(force: bool = False) -> pd.DataFrame:
+    return _get_macro_cache(force=force)[0]
+
+
+def get_macro_feature_frame(force: bool = False) -> pd.DataFrame:
+    """Macro frame plus the precomputed `_level` derived features."""
+    return _get_macro_cache(force=force)[1]
+
+
+def get_macro_version() -> int:
+    """Monotonic counter bumped whenever the in-memory macro frame is rebuilt."""
+    return _get_macro_cache()[2]
+
+
+def _index_fingerprint(values: np.ndarray) -> tuple[int, int, int, int]:
+    return (len(values), int(values[0]), int(values[-1]), int(values.sum()))
+
+
+def _find_align_prefix(version: int, lag_days: int, values: np.ndarray):
+    """Return the cached (pre-lag, aligned) frames whose index is a prefix of `values`."""
+    for key in reversed(_ALIGN_CACHE):
+        cached_version, (length, first, last, checksum), cached_lag = key
+        if cached_version != version or cached_lag != lag_days or length >= len(values):
+            continue
+        if first != values[0] or last != values[length - 1]:
+            continue
+        if int(values[:length].sum()) != checksum:
+            continue
+        return _ALIGN_CACHE[key]
+    return None
+
+
+def _align_frame(df: pd.DataFrame, index: pd.DatetimeIndex, lag_days: int) -> tuple[pd.DataFrame, pd.DataFrame]:
+    base = df.reindex(index).ffill()
+    aligned = base.shift(lag_days).ffill() if lag_days else base
+    return base, aligned
+
+
+def _extend_aligned_frame(
+    df: pd.DataFrame,
+    prefix: tuple[pd.DataFrame, pd.DataFrame],
+    new_index: pd.DatetimeIndex,
+    lag_days: int,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    prev_base, prev_aligned = prefix
+    # Only the trailing `lag_days + 1` rows influence the ffill/shift of new rows.
+    context = prev_base.iloc[-(lag_days + 1):]
+    tail_base = pd.concat([context, df.reindex(new_index)]).ffill()
+    new_base = tail_base.iloc[len(context):]
+    if lag_days:
+        shifted = tail_base.shift(lag_days).iloc[len(context):]
+        new_aligned = pd.concat([prev_aligned.iloc[-1:], shifted]).ffill().iloc[1:]
+    else:
+        new_aligned = new_base
+    return pd.concat([prev_base, new_base]), pd.concat([prev_aligned, new_aligned])
 
 
 def align_macro_to_index(index: pd.Index, lag_days: int = 1) -> pd.DataFrame:
-    df = get_macro_frame()
+    """
+    Align the macro feature frame to `index`, lagged by `lag_days` rows.
+
+    Results are memoized per (macro version, index fingerprint, lag). When the
+    index extends a previously aligned one, only the appended dates are aligned.
+    The returned frame is shared with the cache and must not be mutated.
+    """
+    _, df, version = _get_macro_cache()
     if df.empty:
         return pd.DataFrame(index=index)
-    aligned = df.reindex(pd.to_datetime(index)).ffill()
-    if lag_days:
-        aligned = aligned.shift(lag_days).ffill()
-    # Derived features for level series (e.g., price levels)
-    level_cols = [col for col in aligned.columns if col.endswith("_level")]
-    for col in level_cols:
-        series = aligned[col].astype(float)
-        for window in (20, 60):
-            rolling_mean = series.rolling(window).mean()
-            rolling_std = series.rolling(window).std()
-            zscore = (series - rolling_mean) / rolling_std
-            aligned[f"{col}_z{window}"] = zscore.replace([np.inf, -np.inf], np.nan)
-            pct_from_ma = (series / rolling_mean - 1.0) * 100.0
-            aligned[f"{col}_pct_ma{window}"] = pct_from_ma.replace([np.inf, -np.inf], np.nan)
-    return aligned
+    index = pd.DatetimeIndex(pd.to_datetime(index))
+    if len(index) == 0:
+        return df.iloc[0:0].reindex(index)
+    values = index.asi8
+    key = (version, _index_fingerprint(values), lag_days)
+    with _ALIGN_LOCK:
+        entry = _ALIGN_CACHE.get(key)
+        if entry is not None:
+            _ALIGN_CACHE.move_to_end(key)
+            return entry[1]
+        prefix = _find_align_prefix(version, lag_days, values)
+    if prefix is not None:
+        entry = _extend_aligned_frame(df, prefix, index[len(prefix[0]):], lag_days)
+    else:
+        entry = _align_frame(df, index, lag_days)
+    with _ALIGN_LOCK:
+        _ALIGN_CACHE[key] = entry
+        while len(_ALIGN_CACHE) > ALIGN_CACHE_MAX_ENTRIES:
+            _ALIGN_CACHE.popitem(last=False)
+    return entry[1]
 
 
 def warm_macro_cache():
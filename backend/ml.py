@@ -1,24 +1,48 @@
 # backend/ml.py
 
 from pathlib import Path
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import hashlib
 import json
+import multiprocessing
+import os
 import time
-from threading import Lock
+import uuid
+import warnings
+from threading import Event, Lock
+from typing import Callable
 import numpy as np
 import pandas as pd
+from threadpoolctl import threadpool_limits
 from sklearn.preprocessing import StandardScaler, MinMaxScaler
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.multioutput import MultiOutputRegressor
 from xgboost import XGBRegressor
-from backend.tools import download_prices, get_extended_period, _cooldown_active, _cooldown_remaining_seconds
+from backend.tools import (
+    download_prices,
+    get_extended_period,
+    get_singleflight_stats,
+    _cooldown_active,
+    _load_sp500_universe,
+    _singleflight_call,
+    _singleflight_run,
+)
 from yfinance.exceptions import YFRateLimitError
 from backend.macro import align_macro_to_index
-
-OUTPUT_DIR = Path(__file__).resolve().parent / "output"
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
-AUTO_MODEL_POOL = ["XGBoost", "RandomForest", "GBR"]
+from backend.registry import registry_get, registry_latest, registry_put
+from backend.artifacts import artifacts_enabled, save_artifacts
+from backend.budget import ML_TRAINING_THREADS, training_slot
+
+AUTO_MODEL_POOL = ["XGBoost", "RandomForest", "GBR", "HistGBR"]
+# Tree learners fit on float32 internally, so they are handed float32 design
+# matrices directly; LinearRegression keeps float64 for its least-squares solve.
+# HistGBR bins its input from float64, so float32 would only add a copy.
+FLOAT32_MODELS = {"XGBoost", "RandomForest", "GBR"}
 ML_QUALITY_MIN_R2 = 0.05
 ML_QUALITY_MIN_IMPROVEMENT = 0.01  # 1% better than baseline RMSE
 
@@ -26,6 +50,152 @@ ML_CACHE_TTL = 60 * 60 * 24
 ML_CACHE: dict[tuple, tuple[float, dict]] = {}
 ML_CACHE_LOCK = Lock()
 
+# Walk-forward folds run on a shared process pool. The training that fans out
+# holds one slot of ML_TRAINING_THREADS threads, so the pool's workers split
+# those threads rather than sizing themselves to the host.
+ML_WALK_FORWARD_WORKERS = max(1, min(4, ML_TRAINING_THREADS))
+ML_THREADS_PER_WORKER = max(1, ML_TRAINING_THREADS // ML_WALK_FORWARD_WORKERS)
+_FOLD_POOL: ProcessPoolExecutor | None = None
+_FOLD_POOL_LOCK = Lock()
+
+# Forecast strategies. "recursive" predicts one bar at a time and feeds each
+# prediction back through the features; "direct" fits every horizon of the
+# path at once on shifted targets and predicts it in one call. Learners without
+# native multi-output support get one estimator per horizon, fitted in parallel.
+ML_STRATEGIES = ("recursive", "direct")
+ML_DIRECT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+ML_DIRECT_MIN_ROWS = 30
+MULTI_OUTPUT_MODELS = {"XGBoost", "RandomForest", "LinearRegression"}
+# Learners whose one-bar-ahead output depends on the other horizons (shared
+# splits, or shared row/column sampling), so direct walk-forward folds fit the
+# whole path to score the served model; the rest fit the first horizon alone.
+JOINT_OUTPUT_MODELS = {"XGBoost", "RandomForest"}
+
+# Scenario mode: N perturbed projection paths, each step adding a one-step
+# walk-forward residual drawn with replacement. Paths are stepped together, so
+# the model predicts once per step on an N-row matrix.
+ML_SCENARIO_MAX_PATHS = 1000
+ML_SCENARIO_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Incremental refresh: when a config's bars only gained new rows since its
+# registered fit, the fit is brought up to date instead of retrained. XGBoost
+# boosts a few more rounds, scaled LinearRegression takes rank-one updates of
+# its QR factor, ARIMA appends the bars to its state, and other trees are kept
+# unless their error on the new bars drifts past ML_REFRESH_DRIFT_RATIO times
+# their walk-forward RMSE. Metrics carry over from the full fit.
+ML_REFRESH_MAX_NEW_BARS = 30
+ML_REFRESH_MAX_CHAIN = 20  # incremental updates in a row before a full retrain
+ML_REFRESH_BOOST_ROUNDS = 10
+ML_REFRESH_MAX_ROUNDS_FACTOR = 2  # retrain once the booster doubles in size
+ML_REFRESH_DRIFT_RATIO = 1.5
+
+# Tuning memory: the auto-tune winner per (ticker, interval, feature set) is
+# persisted with its walk-forward RMSE. When validation fails again, that
+# candidate alone is re-scored first; the full search only re-runs when it
+# stops passing validation it used to pass, its RMSE has degraded past
+# ML_TUNING_MAX_DEGRADATION, or the memory is older than ML_TUNING_TTL or
+# ML_TUNING_MAX_NEW_BARS bars.
+ML_TUNING_PATH = Path(__file__).resolve().parent / "output" / "ml_tuning.json"
+ML_TUNING_TTL = 30 * 24 * 60 * 60
+ML_TUNING_MAX_NEW_BARS = 60
+ML_TUNING_MAX_DEGRADATION = 1.25
+_TUNING_LOCK = Lock()
+
+# Pooled (global) model: one direct multi-horizon estimator fitted on the
+# stacked feature matrices of a ticker universe ("watchlist" or "sp500") and
+# serving any ticker by inference. Features are standardised per ticker and
+# targets are forward returns, so tickers at any price level share one scale.
+# ML_WARM_POOLED makes the daily warm-up fit it once instead of one model per
+# watchlist ticker.
+ML_POOLED_UNIVERSE = "watchlist"
+ML_POOLED_TTL = 60 * 60 * 24
+ML_POOLED_MIN_TICKERS = 2
+ML_WARM_POOLED = False
+_POOLED_MODELS: dict[tuple, dict] = {}
+_POOLED_LOCK = Lock()
+
+# Warm scheduler: every day (or as soon as the watchlist changes) the most
+# requested ML configurations of the recent traffic are warmed for every
+# watchlist ticker, ML_WARM_WORKERS at a time so interactive requests keep the
+# rest of the CPUs. Without traffic it warms ML_WARM_DEFAULT_CONFIG.
+ML_WARM_TOP_CONFIGS = 3
+ML_WARM_WORKERS = max(1, (os.cpu_count() or 1) // 2)
+ML_WARM_TRAFFIC_WINDOW = 7 * 24 * 60 * 60
+ML_WARM_TRAFFIC_MAX_EVENTS = 10_000
+ML_WARM_TRAFFIC_PATH = Path(__file__).resolve().parent / "output" / "ml_traffic.json"
+ML_WARM_DEFAULT_CONFIG = {
+    "period": "1y",
+    "interval": "1d",
+    "model_type": "XGBoost",
+    "pre_days": 20,
+    "test_days": 10,
+    "ma1": 50,
+    "ma2": 150,
+    "ema1": 50,
+    "arima_order": (5, 1, 0),
+    "scaler_type": "standard",
+    "feature_flags": None,  # DEFAULT_FEATURE_FLAGS
+}
+_WARM_CONFIG_FIELDS = (
+    "period",
+    "interval",
+    "model_type",
+    "pre_days",
+    "test_days",
+    "ma1",
+    "ma2",
+    "ema1",
+    "arima_order",
+    "scaler_type",
+    "feature_flags",
+    "strategy",
+    "scenarios",
+    "pooled",
+)
+_ML_TRAFFIC: deque[tuple[float, str]] = deque(maxlen=ML_WARM_TRAFFIC_MAX_EVENTS)
+_ML_TRAFFIC_LOCK = Lock()
+_ML_TRAFFIC_LOADED = False
+_WARM_REQUESTED = Event()
+_WARM_STATS: dict = {}
+
+# Auto-tune successive halving: each rung scores the survivors on ~ETA times
+# more (most recent) walk-forward folds and keeps the best 1/ETA of them.
+ML_AUTO_TUNE_ETA = 3
+ML_AUTO_TUNE_MIN_FOLDS = 2
+
+# arima_order="auto": d is the number of differences until an ADF test rejects
+# a unit root (at most ML_ARIMA_AUTO_MAX_D), then (p, q) is chosen by AIC over
+# the bounded grid, fitted in parallel on the fold pool. Chosen orders are
+# cached per (ticker, interval, close-series fingerprint).
+ML_ARIMA_AUTO_MAX_P = 5
+ML_ARIMA_AUTO_MAX_D = 2
+ML_ARIMA_AUTO_MAX_Q = 2
+ML_ARIMA_DEFAULT_ORDER = (5, 1, 0)
+ML_ARIMA_ORDER_CACHE_MAX_ENTRIES = 256
+_ARIMA_ORDER_CACHE: OrderedDict[tuple, tuple[tuple[int, int, int], float]] = OrderedDict()
+_ARIMA_ORDER_LOCK = Lock()
+
+# Wall-clock budget for one /ml request; 0 disables the deadline.
+ML_DEFAULT_DEADLINE_MS = 60_000
+
+# Fitted models kept in memory per training config (the cache key without
+# model_type, pre_days and test_days) and data fingerprint. A new horizon only
+# re-projects; a new test_days only scores the folds not computed yet.
+ML_WARM_POOL_MAX_ENTRIES = 16
+_WARM_POOL: OrderedDict[tuple, dict] = OrderedDict()
+_WARM_POOL_LOCK = Lock()
+
+# Feature matrices shared by every model fitted on the same bars with the same
+# indicator windows and enabled features, keyed by (data fingerprint, ma1, ma2,
+# ema1, enabled flags). Per-fold scalers are fitted lazily on first use and
+# shared by all candidates.
+ML_MATRIX_CACHE_MAX_ENTRIES = 16
+_MATRIX_CACHE: OrderedDict[tuple, dict] = OrderedDict()
+_MATRIX_CACHE_LOCK = Lock()
+# Every feature, enabled or not, for (data fingerprint, ma1, ma2, ema1): the
+# walk-forward row set needs them all, and flag combinations only pick columns.
+_FEATURE_CACHE: OrderedDict[tuple, tuple[dict, pd.Series]] = OrderedDict()
+
 DEFAULT_FEATURE_FLAGS = {
     "ma50": True,
     "ma100": False,
@@ -53,6 +223,478 @@ DEFAULT_FEATURE_FLAGS = {
     "silver_ret": False,
 }
 
+def _make_scaler(scaler_type: str, model_type: str):
+    if scaler_type == "auto":
+        if model_type in {"XGBoost", "RandomForest", "GBR", "HistGBR", "ARIMA"}:
+            return None
+        return StandardScaler()
+    if scaler_type == "minmax":
+        return MinMaxScaler(feature_range=(-1, 1))
+    elif scaler_type == "standard":
+        return StandardScaler()
+    elif scaler_type == "none":
+        return None
+    else:
+        raise ValueError(f"Unknown scaler type: {scaler_type}")
+
+
+# Design matrices hold the enabled features only. RandomForest and GBR draw
+# their per-split feature order from the column count, so versus the former
+# full-width layout (disabled columns zeroed) their fits differ in how ties
+# between equally good splits break; that is accepted for the narrower fits.
+def _design_matrix(X: np.ndarray, model_type: str) -> np.ndarray:
+    dtype = np.float32 if model_type in FLOAT32_MODELS else np.float64
+    return np.asarray(X, dtype=dtype)
+
+
+def _scaler_kind(scaler_type: str, model_type: str) -> str | None:
+    """Name of the scaler class `_make_scaler` picks; fold scalers are shared per kind."""
+    scaler = _make_scaler(scaler_type, model_type)
+    return type(scaler).__name__ if scaler is not None else None
+
+
+def _make_model(model_type: str, seed: int, model_params: dict | None = None, n_jobs: int | None = None):
+    threads = {"n_jobs": n_jobs} if n_jobs else {}
+    if model_type == "XGBoost":
+        params = {"random_state": seed, **threads}
+        params.update(model_params or {})
+        return XGBRegressor(**params)
+    elif model_type == "RandomForest":
+        params = {"random_state": seed, **threads}
+        params.update(model_params or {})
+        return RandomForestRegressor(**params)
+    elif model_type == "GBR":
+        params = {"random_state": seed}
+        params.update(model_params or {})
+        return GradientBoostingRegressor(**params)
+    elif model_type == "HistGBR":
+        # Threads come from OpenMP, capped by threadpool limits rather than n_jobs.
+        params = {"random_state": seed}
+        params.update(model_params or {})
+        return HistGradientBoostingRegressor(**params)
+    elif model_type == "LinearRegression":
+        return LinearRegression()
+    elif model_type == "ARIMA":
+        return None  # ARIMA doesn't require initialization here
+    else:
+        raise ValueError(f"Unknown model type: {model_type}")
+
+
+def _make_direct_model(model_type: str, seed: int, model_params: dict | None = None, n_jobs: int | None = None):
+    """Estimator predicting the whole horizon path from one feature row."""
+    if model_type in MULTI_OUTPUT_MODELS:
+        return _make_model(model_type, seed, model_params, n_jobs=n_jobs)
+    model = _make_model(model_type, seed, model_params)
+    if model is None:
+        return model
+    # The thread budget goes to the per-horizon fits, each single-threaded.
+    return MultiOutputRegressor(model, n_jobs=n_jobs or ML_DIRECT_WORKERS)
+
+
+def _horizon_targets(prices: np.ndarray, horizon: int) -> np.ndarray:
+    """Row t holds closes t+1..t+horizon; rows without a full path are dropped."""
+    return np.lib.stride_tricks.sliding_window_view(prices[1:], horizon)
+
+
+def _get_fold_pool() -> ProcessPoolExecutor:
+    global _FOLD_POOL
+    with _FOLD_POOL_LOCK:
+        if _FOLD_POOL is None:
+            # spawn: forking a threaded API server is unsafe
+            _FOLD_POOL = ProcessPoolExecutor(
+                max_workers=ML_WALK_FORWARD_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _FOLD_POOL
+
+
+def _reset_fold_pool():
+    global _FOLD_POOL
+    with _FOLD_POOL_LOCK:
+        if _FOLD_POOL is not None:
+            _FOLD_POOL.shutdown(wait=False, cancel_futures=True)
+        _FOLD_POOL = None
+
+
+def _resolve_deadline(deadline_ms: int | None) -> float | None:
+    """Absolute wall-clock deadline (comparable across processes) for a budget in ms."""
+    if deadline_ms is None:
+        deadline_ms = ML_DEFAULT_DEADLINE_MS
+    if not deadline_ms or deadline_ms <= 0:
+        return None
+    return time.time() + deadline_ms / 1000.0
+
+
+def _deadline_passed(deadline: float | None) -> bool:
+    return deadline is not None and time.time() >= deadline
+
+
+def _walk_forward_fold_chunk(task: dict) -> list[float]:
+    """
+    Fit a fresh scaler + model on rows [:i] and predict row i, for each fold i.
+
+    With a direct `horizon` h > 1 the model, like the served one, only learns
+    from the rows whose whole h-bar path is known by fold i, and the first
+    horizon of its prediction is scored. Stops between folds once the task
+    deadline passes, returning the predictions for the folds completed so far.
+    """
+    X, y = task["X"], task["y"]
+    kind = _scaler_kind(task["scaler_type"], task["model_type"])
+    fold_scalers = task.get("fold_scalers") or {}
+    horizon = task.get("horizon", 1)
+    joint = horizon > 1 and task["model_type"] in JOINT_OUTPUT_MODELS
+    preds = []
+    with threadpool_limits(task["threads"]):
+        for i in task["folds"]:
+            if _deadline_passed(task.get("deadline")):
+                break
+            X_train, y_train, X_test = X[:i], y[:i], X[i:i + 1]
+            if kind:
+                scaler = fold_scalers.get((kind, i))
+                if scaler is None:
+                    scaler = _make_scaler(task["scaler_type"], task["model_type"]).fit(X_train)
+                X_train = scaler.transform(X_train)
+                X_test = scaler.transform(X_test)
+            X_train = _design_matrix(X_train, task["model_type"])
+            X_test = _design_matrix(X_test, task["model_type"])
+            model = _make_model(task["model_type"], task["seed"], task["model_params"], n_jobs=task["threads"])
+            if horizon > 1:
+                # y holds next-bar closes, so its windows are the h-bar paths
+                paths = np.lib.stride_tricks.sliding_window_view(y_train, horizon)
+                model.fit(X_train[: len(paths)], paths if joint else paths[:, 0])
+                preds.append(float(np.ravel(model.predict(X_test))[0]))
+                continue
+            model.fit(X_train, y_train)
+            preds.append(float(model.predict(X_test)[0]))
+    return preds
+
+
+def _candidate_fold_chunk(task: dict) -> list[float] | None:
+    """Auto-tune variant of `_walk_forward_fold_chunk`: a failing candidate yields None."""
+    try:
+        return _walk_forward_fold_chunk(task)
+    except Exception:
+        return None
+
+
+def _givens_append(R: np.ndarray, row: np.ndarray):
+    """Update the upper-triangular factor `R` in place for one appended row."""
+    row = row.copy()
+    for j in range(len(row)):
+        if row[j] == 0.0:
+            continue
+        r = np.hypot(R[j, j], row[j])
+        c, s = R[j, j] / r, row[j] / r
+        Rj = R[j, j:].copy()
+        R[j, j:] = c * Rj + s * row[j:]
+        row[j:] = c * row[j:] - s * Rj
+
+
+def _linear_walk_forward(
+    X: np.ndarray,
+    y: np.ndarray,
+    folds: list[int],
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+    lag: int = 0,
+) -> dict[int, float]:
+    """
+    Walk-forward LinearRegression predictions from one recursive-least-squares pass.
+
+    Equivalent to refitting a scaler + LinearRegression on rows [:i - lag] for
+    each fold i: OLS predictions with an intercept are invariant to per-column
+    affine scaling, so rows are standardised once with the first window's
+    statistics. The QR factor of [1, X | y] is then extended by one Givens
+    sweep per new row (O(k^2)), and each fold solves a (k+1)-sized
+    least-squares problem.
+    """
+    preds: dict[int, float] = {}
+    if not folds:
+        return preds
+    folds = sorted(folds)
+    scaler = StandardScaler().fit(X[: folds[0]])
+    Z = scaler.transform(X)
+    k = Z.shape[1] + 1
+    first = max(0, folds[0] - lag)
+    A = np.column_stack([np.ones(first), Z[:first], y[:first]])
+    R = np.zeros((k + 1, k + 1))
+    r = np.linalg.qr(A, mode="r")
+    R[: r.shape[0]] = r
+    seen = first
+    for n, i in enumerate(folds, start=1):
+        if _deadline_passed(deadline):
+            break
+        for t in range(seen, i - lag):
+            _givens_append(R, np.concatenate(([1.0], Z[t], [y[t]])))
+        seen = max(seen, i - lag)
+        coef = np.linalg.lstsq(R[:k, :k], R[:k, k], rcond=None)[0]
+        preds[i] = float(coef[0] + Z[i] @ coef[1:])
+        if progress:
+            progress({"stage": "walk_forward", "fold": n, "folds": len(folds)})
+    return preds
+
+
+def _arima_walk_forward(
+    series: np.ndarray,
+    order: tuple[int, int, int],
+    folds: list[int],
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> dict[int, float]:
+    """
+    One-step ARIMA forecasts for each fold i, from a single fit on series[:folds[0]].
+
+    Later folds extend the fitted state space with the observations seen since
+    (same parameters, no refit), so the cost is one fit plus one filter step
+    per fold rather than a fit per fold.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    preds: dict[int, float] = {}
+    if not folds:
+        return preds
+    start = folds[0]
+    try:
+        results = ARIMA(series[:start], order=order).fit()
+    except Exception:
+        results = None
+    seen = start
+    for n, i in enumerate(folds, start=1):
+        if _deadline_passed(deadline):
+            break
+        try:
+            if results is None:
+                raise ValueError("ARIMA fit failed")
+            if i > seen:
+                results = results.extend(series[seen:i])
+                seen = i
+            preds[i] = float(results.forecast(steps=1)[0])
+        except Exception:
+            # Fall back to the last observation (the naive baseline).
+            preds[i] = float(series[i - 1])
+        if progress:
+            progress({"stage": "walk_forward", "fold": n, "folds": len(folds)})
+    return preds
+
+
+def _arima_aic_chunk(task: dict) -> list[float]:
+    """AIC of an ARIMA fit on the task series for each order; inf where a fit fails."""
+    from statsmodels.tsa.arima.model import ARIMA
+
+    series = task["series"]
+    aics = []
+    # Poorly specified candidates are expected in a grid; keep their fit warnings quiet.
+    with threadpool_limits(task["threads"]), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for order in task["orders"]:
+            if _deadline_passed(task.get("deadline")):
+                break
+            try:
+                aics.append(float(ARIMA(series, order=order).fit().aic))
+            except Exception:
+                aics.append(float("inf"))
+    return aics
+
+
+def _arima_differences(series: np.ndarray) -> int:
+    """Differences needed before an ADF test rejects a unit root (5% level)."""
+    from statsmodels.tsa.stattools import adfuller
+
+    values = series
+    for d in range(ML_ARIMA_AUTO_MAX_D):
+        try:
+            if adfuller(values, autolag="AIC")[1] < 0.05:
+                return d
+        except Exception:
+            return max(d, 1)
+        values = np.diff(values)
+    return ML_ARIMA_AUTO_MAX_D
+
+
+def _auto_arima_order(
+    ticker: str,
+    interval: str,
+    series: np.ndarray,
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> tuple[tuple[int, int, int], dict]:
+    """
+    Choose an ARIMA order for `series` by AIC and return it with a search summary.
+
+    The (p, q) grid is split across the fold pool. If the deadline cuts the
+    search short, the best order found so far is used (the default order if
+    none finished) and the summary is flagged incomplete; only complete
+    searches are cached.
+    """
+    key = (ticker.upper(), interval, hashlib.sha1(np.ascontiguousarray(series).tobytes()).hexdigest())
+    n_orders = (ML_ARIMA_AUTO_MAX_P + 1) * (ML_ARIMA_AUTO_MAX_Q + 1)
+    with _ARIMA_ORDER_LOCK:
+        cached = _ARIMA_ORDER_CACHE.get(key)
+        if cached is not None:
+            _ARIMA_ORDER_CACHE.move_to_end(key)
+    if cached is not None:
+        order, aic = cached
+        return order, {
+            "searched": True,
+            "model": "ARIMA",
+            "candidates": n_orders,
+            "best_params": {"order": list(order), "aic": aic},
+            "fits": 0,
+            "complete": True,
+        }
+
+    d = _arima_differences(series)
+    orders = [(p, d, q) for p in range(ML_ARIMA_AUTO_MAX_P + 1) for q in range(ML_ARIMA_AUTO_MAX_Q + 1)]
+    workers = max(1, min(ML_WALK_FORWARD_WORKERS, len(orders)))
+    chunks = [orders[w::workers] for w in range(workers)]
+    finished = 0
+
+    def _on_done(_idx: int):
+        nonlocal finished
+        finished += 1
+        progress({"stage": "arima_search", "task": finished, "tasks": len(chunks)})
+
+    results = _run_fold_tasks(
+        _arima_aic_chunk,
+        [{"series": series, "orders": chunk} for chunk in chunks],
+        workers,
+        deadline,
+        _on_done if progress else None,
+    )
+    scores = {
+        order: aic
+        for chunk, aics in zip(chunks, results)
+        for order, aic in zip(chunk, aics or [])
+    }
+    finite = {order: aic for order, aic in scores.items() if np.isfinite(aic)}
+    complete = len(scores) == len(orders)
+    order = min(finite, key=lambda o: (finite[o], o)) if finite else ML_ARIMA_DEFAULT_ORDER
+    if complete and finite:
+        with _ARIMA_ORDER_LOCK:
+            _ARIMA_ORDER_CACHE[key] = (order, finite[order])
+            while len(_ARIMA_ORDER_CACHE) > ML_ARIMA_ORDER_CACHE_MAX_ENTRIES:
+                _ARIMA_ORDER_CACHE.popitem(last=False)
+    return order, {
+        "searched": True,
+        "model": "ARIMA",
+        "candidates": len(orders),
+        "best_params": {"order": list(order), "aic": finite.get(order)},
+        "fits": len(scores),
+        "complete": complete,
+    }
+
+
+def _run_fold_tasks(
+    fn,
+    tasks: list[dict],
+    workers: int | None = None,
+    deadline: float | None = None,
+    on_done: Callable[[int], None] | None = None,
+) -> list[list[float] | None]:
+    """
+    Run each fold task with `fn` on the fold pool, returning results in task order.
+
+    Every fold is fitted with fixed seeds and thread counts, so pooled and
+    in-process runs produce the same numbers. Past `deadline`, queued tasks are
+    cancelled (and return no predictions) while running ones stop at their next
+    fold, so callers get a prefix of each task's folds. `on_done(task_index)` is
+    called as each task finishes.
+    """
+    workers = ML_WALK_FORWARD_WORKERS if workers is None else max(1, workers)
+    tasks = [{**task, "threads": ML_THREADS_PER_WORKER, "deadline": deadline} for task in tasks]
+
+    def _run_in_process():
+        results = []
+        for idx, task in enumerate(tasks):
+            results.append(fn(task))
+            if on_done:
+                on_done(idx)
+        return results
+
+    if workers <= 1 or len(tasks) <= 1:
+        return _run_in_process()
+    try:
+        pool = _get_fold_pool()
+        futures = {pool.submit(fn, task): idx for idx, task in enumerate(tasks)}
+        timeout = None if deadline is None else max(0.0, deadline - time.time())
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                if on_done:
+                    on_done(futures[future])
+        except FuturesTimeoutError:
+            for future in futures:
+                future.cancel()
+        return [[] if future.cancelled() else future.result() for future in futures]
+    except BrokenProcessPool:
+        _reset_fold_pool()
+        return _run_in_process()
+
+
+def _run_folds(
+    fn,
+    task: dict,
+    folds: list[int],
+    workers: int | None = None,
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+) -> dict[int, float]:
+    """
+    Evaluate `folds` with `fn`, interleaving them across the fold pool.
+
+    With a `progress` callback each fold becomes its own task so completion can
+    be reported fold by fold.
+    """
+    workers = ML_WALK_FORWARD_WORKERS if workers is None else max(1, workers)
+    workers = max(1, min(workers, len(folds)))
+    if progress:
+        chunks = [[fold] for fold in folds]
+    else:
+        chunks = [folds[w::workers] for w in range(workers)]
+    completed = 0
+
+    def _on_done(_idx: int):
+        nonlocal completed
+        completed += 1
+        progress({"stage": "walk_forward", "fold": completed, "folds": len(folds)})
+
+    results = _run_fold_tasks(
+        fn,
+        [{**task, "folds": chunk} for chunk in chunks],
+        workers,
+        deadline,
+        _on_done if progress else None,
+    )
+    by_fold = {}
+    for chunk, preds in zip(chunks, results):
+        by_fold.update(zip(chunk, preds))
+    return {i: by_fold[i] for i in folds if i in by_fold}
+
+
+def _run_cached_folds(
+    fn,
+    inputs: dict,
+    workers: int | None = None,
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+    fold_cache: dict[int, float] | None = None,
+) -> dict[int, float]:
+    """`_run_folds` over `inputs["folds"]`, skipping (and filling) folds already in `fold_cache`."""
+    if fold_cache is None:
+        return _run_folds(fn, inputs["task"], inputs["folds"], workers, deadline, progress)
+    missing = [i for i in inputs["folds"] if i not in fold_cache]
+    if missing:
+        fold_cache.update(_run_folds(fn, inputs["task"], missing, workers, deadline, progress))
+    return {i: fold_cache[i] for i in inputs["folds"] if i in fold_cache}
+
+
+def _halving_rungs(test_days: int) -> list[int]:
+    """Fold counts per successive-halving rung, ending with the full `test_days`."""
+    rungs = [test_days]
+    while rungs[0] // ML_AUTO_TUNE_ETA >= ML_AUTO_TUNE_MIN_FOLDS:
+        rungs.insert(0, rungs[0] // ML_AUTO_TUNE_ETA)
+    return rungs
+
+
 def _regression_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> dict:
     y_true = np.asarray(y_true, dtype=float)
     y_pred = np.asarray(y_pred, dtype=float)
@@ -115,6 +757,145 @@ def _build_validation(metrics: dict | None) -> dict | None:
     }
 
 
+def _walk_forward_result(test_days: int, inputs: dict, preds: dict[int, float]) -> dict | None:
+    """Metrics payload over the folds of `inputs` that have a prediction in `preds`."""
+    positions = [pos for pos, fold in enumerate(inputs["folds"]) if fold in preds]
+    if not positions:
+        return None
+    actuals = np.asarray(inputs["actuals"], dtype=float)[positions]
+    baseline = np.asarray(inputs["baseline"], dtype=float)[positions]
+    y_pred = np.array([preds[inputs["folds"][pos]] for pos in positions])
+    return {
+        "test_days": test_days,
+        "model": _regression_metrics(actuals, y_pred),
+        "baseline_last": _regression_metrics(actuals, baseline),
+        "residuals": (actuals - y_pred).tolist(),
+    }
+
+
+def _split_residuals(metrics: dict | None) -> tuple[dict | None, list[float] | None]:
+    """Walk-forward metrics without their residuals (kept out of payloads), and the residuals."""
+    if not metrics:
+        return metrics, None
+    return {k: v for k, v in metrics.items() if k != "residuals"}, metrics.get("residuals")
+
+
+def _scenario_bands(
+    model: "StockPredictionModel",
+    days: int,
+    paths: int,
+    residuals: list[float],
+    progress: Callable[[dict], None] | None = None,
+) -> dict:
+    """Percentile bands over `paths` simulated projections of `days` bars."""
+    simulated = model.iterate_scenarios(days, paths, residuals, progress=progress)
+    bands = np.percentile(simulated, ML_SCENARIO_PERCENTILES, axis=0)
+    dates = _projection_dates(model.real_prices.index, days)
+    return {
+        "Date": dates.astype(str).tolist(),
+        "paths": paths,
+        **{f"p{pct}": band.tolist() for pct, band in zip(ML_SCENARIO_PERCENTILES, bands)},
+    }
+
+
+def _successive_halving(
+    inputs: dict,
+    candidates: list[tuple[str, dict]],
+    test_days: int,
+    deadline: float | None = None,
+    progress: Callable[[dict], None] | None = None,
+    fold_cache: dict[tuple, dict[int, float]] | None = None,
+) -> dict | None:
+    """
+    Score (model_type, params) candidates on the shared walk-forward matrix.
+
+    Rung k scores every survivor on the most recent `rungs[k]` folds (reusing
+    fold predictions from earlier rungs) and promotes the best 1/ETA. All
+    candidates of a rung are fitted concurrently on the fold pool. If the
+    deadline cuts a rung short, the ranking of the last finished rung wins and
+    the result is flagged incomplete. `fold_cache` (keyed by
+    (model_type, params key)) carries fold predictions across requests.
+    """
+    if not candidates:
+        return None
+    folds = inputs["folds"]
+    if fold_cache is None:
+        preds: list[dict[int, float]] = [{} for _ in candidates]
+    else:
+        preds = [fold_cache.setdefault((model_type, _params_key(params)), {}) for model_type, params in candidates]
+    alive = list(range(len(candidates)))
+    ranking: list[int] | None = None
+    complete = True
+    fits = 0
+    rungs = _halving_rungs(len(folds))
+    for rung, n_folds in enumerate(rungs):
+        if _deadline_passed(deadline):
+            complete = False
+            break
+        rung_folds = folds[-n_folds:]
+        tasks, owners = [], []
+        for idx in alive:
+            model_type, params = candidates[idx]
+            missing = [i for i in rung_folds if i not in preds[idx]]
+            if missing:
+                tasks.append(inputs["task"] | {"model_type": model_type, "model_params": params, "folds": missing})
+                owners.append(idx)
+
+        def _on_done(task_idx: int):
+            model_type, params = candidates[owners[task_idx]]
+            progress({
+                "stage": "auto_tune",
+                "rung": rung + 1,
+                "rungs": len(rungs),
+                "candidate": owners[task_idx] + 1,
+                "candidates": len(candidates),
+                "model": model_type,
+                "params": params,
+            })
+
+        results = _run_fold_tasks(
+            _candidate_fold_chunk, tasks, deadline=deadline, on_done=_on_done if progress else None
+        )
+        for idx, task, result in zip(owners, tasks, results):
+            if result is None:
+                alive.remove(idx)
+                if ranking and idx in ranking:
+                    ranking.remove(idx)
+                continue
+            fits += len(result)
+            preds[idx].update(zip(task["folds"], result))
+        if not alive:
+            break
+        if any(i not in preds[idx] for idx in alive for i in rung_folds):
+            complete = False
+            break
+
+        actuals = dict(zip(folds, inputs["actuals"]))
+        scores = {}
+        for idx in alive:
+            y_true = np.array([actuals[i] for i in rung_folds])
+            y_pred = np.array([preds[idx][i] for i in rung_folds])
+            scores[idx] = float(np.sqrt(np.mean((y_true - y_pred) ** 2)))
+        ranking = sorted(alive, key=lambda idx: (scores[idx], idx))
+        alive = list(ranking)
+        if rung < len(rungs) - 1:
+            alive = alive[: max(1, -(-len(alive) // ML_AUTO_TUNE_ETA))]
+
+    if not ranking:
+        return None
+    winner = ranking[0]
+    model_type, params = candidates[winner]
+    return {
+        "model_type": model_type,
+        "params": params,
+        "metrics": _walk_forward_result(test_days, inputs, preds[winner]),
+        "candidates": len(candidates),
+        "rungs": rungs,
+        "fits": fits,
+        "complete": complete,
+    }
+
+
 def _param_grid(model_type: str) -> list[dict]:
     if model_type == "XGBoost":
         return [
@@ -134,6 +915,12 @@ def _param_grid(model_type: str) -> list[dict]:
             {"n_estimators": 300, "learning_rate": 0.05, "max_depth": 3},
             {"n_estimators": 200, "learning_rate": 0.1, "max_depth": 3},
         ]
+    if model_type == "HistGBR":
+        return [
+            {"max_iter": 200, "learning_rate": 0.05, "max_depth": 2, "min_samples_leaf": 10},
+            {"max_iter": 300, "learning_rate": 0.05, "max_depth": 3, "min_samples_leaf": 10},
+            {"max_iter": 200, "learning_rate": 0.1, "max_depth": 3, "min_samples_leaf": 20},
+        ]
     return [{}]
 
 
@@ -147,9 +934,12 @@ def _cache_key(
     ma1: int,
     ma2: int,
     ema1: int,
-    arima_order: tuple[int, int, int],
+    arima_order: tuple[int, int, int] | str,
     scaler_type: str,
     feature_flags: dict,
+    strategy: str = "recursive",
+    pooled: bool = False,
+    scenarios: int = 0,
 ) -> tuple:
     flags = tuple(sorted((k, bool(v)) for k, v in (feature_flags or {}).items()))
     return (
@@ -165,9 +955,117 @@ def _cache_key(
         arima_order,
         scaler_type,
         flags,
+        strategy,
+        pooled,
+        scenarios,
     )
 
 
+def _params_key(model_params: dict | None) -> tuple:
+    return tuple(sorted((model_params or {}).items()))
+
+
+def _warm_pool_entry(cache_key: tuple, fingerprint: str, reset: bool = False) -> dict:
+    """
+    Warm-pool slot for this training config and data.
+
+    Holds fitted models and walk-forward fold predictions, both keyed by
+    (model_type, params key). Least recently used slots are dropped first;
+    `reset` starts the slot over.
+    """
+    key = cache_key[:3] + cache_key[6:] + (fingerprint,)
+    with _WARM_POOL_LOCK:
+        entry = _WARM_POOL.get(key)
+        if entry is None or reset:
+            entry = {"key": key, "models": {}, "folds": {}}
+            _WARM_POOL[key] = entry
+            _WARM_POOL.move_to_end(key)
+            while len(_WARM_POOL) > ML_WARM_POOL_MAX_ENTRIES:
+                _WARM_POOL.popitem(last=False)
+        else:
+            _WARM_POOL.move_to_end(key)
+        return entry
+
+
+def _all_features(model: "StockPredictionModel") -> tuple[dict, pd.Series]:
+    """Every feature for `model`'s bars and indicator windows, and the rows where all are present."""
+    key = (model.fingerprint, model.ma1, model.ma2, model.ema1)
+    with _MATRIX_CACHE_LOCK:
+        cached = _FEATURE_CACHE.get(key)
+        if cached is not None:
+            _FEATURE_CACHE.move_to_end(key)
+            return cached
+    features = model.evaluate_features(
+        prices=model.real_prices,
+        high_prices=model.real_high_prices,
+        low_prices=model.real_low_prices,
+        volumes=model.real_volumes,
+        enabled_only=False,
+    )
+    cached = (features, pd.concat(features, axis=1).notna().all(axis=1))
+    with _MATRIX_CACHE_LOCK:
+        cached = _FEATURE_CACHE.setdefault(key, cached)
+        while len(_FEATURE_CACHE) > ML_MATRIX_CACHE_MAX_ENTRIES:
+            _FEATURE_CACHE.popitem(last=False)
+    return cached
+
+
+def _training_matrix(model: "StockPredictionModel") -> dict:
+    """
+    Shared matrix of `model`'s enabled features for its bars and indicator windows.
+
+    `values` is the (features x bars) matrix the full-history fit slices;
+    `wf_X`/`wf_y`/`wf_baseline` are the rows where every feature, enabled or
+    not, is present, with their next-day targets, used by walk-forward
+    validation. Keeping that row set fixed means the flags only choose columns:
+    folds, training windows and metrics match the full-width layout.
+    """
+    key = (model.fingerprint, model.ma1, model.ma2, model.ema1, model.enabled_features_key())
+    with _MATRIX_CACHE_LOCK:
+        matrix = _MATRIX_CACHE.get(key)
+        if matrix is not None:
+            _MATRIX_CACHE.move_to_end(key)
+            return matrix
+
+    all_features, complete = _all_features(model)
+    features = {name: values for name, values in all_features.items() if model._is_feature_enabled(name)}
+    feature_keys = list(features.keys())
+    if not feature_keys:
+        raise ValueError("No features enabled for training.")
+    feature_df = pd.concat(features, axis=1)
+    feature_df["target"] = model.real_prices.shift(-1)
+    feature_df["baseline"] = model.real_prices
+    feature_df = feature_df[complete].dropna()
+    matrix = {
+        "feature_keys": feature_keys,
+        "values": np.array([features[key] for key in feature_keys]),
+        "wf_X": feature_df[feature_keys].values,
+        "wf_y": feature_df["target"].values,
+        "wf_baseline": feature_df["baseline"].values,
+        "fold_scalers": {},
+    }
+    with _MATRIX_CACHE_LOCK:
+        matrix = _MATRIX_CACHE.setdefault(key, matrix)
+        while len(_MATRIX_CACHE) > ML_MATRIX_CACHE_MAX_ENTRIES:
+            _MATRIX_CACHE.popitem(last=False)
+    return matrix
+
+
+def _fold_scalers(matrix: dict, scaler_type: str, model_types: list[str], folds: list[int]) -> dict:
+    """Scalers fitted on wf_X[:i] for each fold i and scaler kind the model types need."""
+    kinds = {_scaler_kind(scaler_type, model_type): model_type for model_type in model_types}
+    kinds.pop(None, None)
+    cache = matrix["fold_scalers"]
+    scalers = {}
+    for kind, model_type in kinds.items():
+        for i in folds:
+            scaler = cache.get((kind, i))
+            if scaler is None:
+                scaler = cache.setdefault((kind, i), _make_scaler(scaler_type, model_type).fit(matrix["wf_X"][:i]))
+            scalers[(kind, i)] = scaler
+    return scalers
+
+
 def _cache_get(key: tuple) -> dict | None:
     with ML_CACHE_LOCK:
         entry = ML_CACHE.get(key)
@@ -184,6 +1082,133 @@ def _cache_set(key: tuple, payload: dict):
         ML_CACHE[key] = (time.time(), payload)
 
 
+def _load_price_data(ticker: str, period: str, interval: str):
+    """Load (close, high, low, volume) series for `ticker` from Yahoo Finance."""
+    try:
+        data = download_prices(
+            ticker, period=period, interval=interval)
+        if data.empty:
+            raise ValueError("No price history returned")
+
+        # yfinance returns single-level columns for one ticker and a
+        # MultiIndex when multiple tickers are requested. Support both
+        # layouts so the ML endpoints work again.
+        if isinstance(data.columns, pd.MultiIndex):
+            try:
+                subset = data.xs(ticker, level=-1, axis=1)
+            except KeyError as exc:
+                raise ValueError(
+                    f"{ticker} not present in downloaded data") from exc
+        else:
+            subset = data
+
+        required = ("Close", "High", "Low", "Volume")
+        missing = [col for col in required if col not in subset.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+        prices = subset["Close"]
+        high_prices = subset["High"]
+        low_prices = subset["Low"]
+        volumes = subset["Volume"]
+        return prices, high_prices, low_prices, volumes
+
+    except Exception as e:
+        raise ValueError(f"Error loading data for {ticker}: {e}")
+
+
+def _flag_for_feature(feature_key: str) -> str:
+    for flag, keys in StockPredictionModel._feature_flag_groups().items():
+        if feature_key in keys:
+            return flag
+    return feature_key
+
+
+def _feature_enabled(feature_flags: dict | None, feature_key: str) -> bool:
+    """Whether `feature_flags` switch `feature_key` on; features without a flag are on."""
+    if not feature_flags:
+        return True
+    return bool(feature_flags.get(_flag_for_feature(feature_key), True))
+
+
+def _training_fingerprint(price_data, feature_flags: dict | None = None) -> str:
+    """
+    Digest of the data a fit sees: the OHLCV bars plus the macro frame aligned to them.
+
+    With `feature_flags` only the macro columns they enable are hashed, so
+    revisions to columns the fit never reads leave its registry entry valid.
+    """
+    prices = price_data[0]
+    digest = hashlib.sha1()
+    digest.update(np.asarray(prices.index.asi8).tobytes())
+    for series in price_data:
+        digest.update(np.ascontiguousarray(series.to_numpy(dtype=float)).tobytes())
+    macro_df = align_macro_to_index(prices.index, lag_days=1)
+    if feature_flags is not None:
+        macro_df = macro_df[[col for col in macro_df.columns if _feature_enabled(feature_flags, col)]]
+    digest.update(",".join(map(str, macro_df.columns)).encode())
+    digest.update(np.ascontiguousarray(macro_df.to_numpy(dtype=float)).tobytes())
+    return digest.hexdigest()
+
+
+def _tuning_key(
+    ticker: str, interval: str, ma1: int, ma2: int, ema1: int, scaler_type: str, feature_flags: dict
+) -> str:
+    flags = tuple(sorted((k, bool(v)) for k, v in (feature_flags or {}).items()))
+    return repr((ticker.upper(), interval, ma1, ma2, ema1, scaler_type, flags))
+
+
+def _read_tuning_memory() -> dict:
+    # Re-read on every use: job processes share the file, not this module's state.
+    try:
+        return json.loads(ML_TUNING_PATH.read_text())
+    except Exception:
+        return {}
+
+
+def _remembered_tuning(key: str, bars: int) -> dict | None:
+    """The remembered auto-tune winner for `key`, unless the data moved on since."""
+    with _TUNING_LOCK:
+        entry = _read_tuning_memory().get(key)
+    if not entry:
+        return None
+    if time.time() - entry["updated"] > ML_TUNING_TTL or abs(bars - entry["bars"]) > ML_TUNING_MAX_NEW_BARS:
+        return None
+    return entry
+
+
+def _remember_tuning(key: str, result: dict, bars: int):
+    entry = {
+        "model_type": result["model_type"],
+        "params": result["params"],
+        "rmse": result["metrics"]["model"]["rmse"],
+        "validation": _build_validation(result["metrics"]),
+        "bars": bars,
+        "updated": time.time(),
+    }
+    with _TUNING_LOCK:
+        memory = _read_tuning_memory()
+        memory[key] = entry
+        try:
+            ML_TUNING_PATH.parent.mkdir(parents=True, exist_ok=True)
+            tmp = ML_TUNING_PATH.with_name(f".{ML_TUNING_PATH.name}.{uuid.uuid4().hex}.tmp")
+            tmp.write_text(json.dumps(memory))
+            os.replace(tmp, ML_TUNING_PATH)
+        except Exception as e:
+            print(f"Tuning memory write failed: {e}")
+
+
+def _tuning_holds(result: dict | None, remembered: dict) -> bool:
+    """Whether a re-scored remembered candidate is still good enough to skip the search."""
+    if not result or not result["complete"] or not result["metrics"]:
+        return False
+    # A winner that used to pass validation must still pass it
+    passed = (_build_validation(result["metrics"]) or {}).get("passed", False)
+    if not passed and (remembered.get("validation") or {}).get("passed"):
+        return False
+    return result["metrics"]["model"].get("rmse", float("inf")) <= remembered["rmse"] * ML_TUNING_MAX_DEGRADATION
+
+
 def _load_watchlist_config() -> list[str]:
     config_path = Path(__file__).resolve().parent / "config.json"
     if not config_path.exists():
@@ -196,56 +1221,147 @@ def _load_watchlist_config() -> list[str]:
         return []
 
 
-def warm_ml_cache_for_watchlist(
-    period: str = "1y",
-    interval: str = "1d",
-    model_type: str = "XGBoost",
-    pre_days: int = 20,
-    test_days: int = 10,
-    ma1: int = 50,
-    ma2: int = 150,
-    ema1: int = 50,
-    scaler_type: str = "standard",
-):
+def _ensure_traffic_loaded():
+    global _ML_TRAFFIC_LOADED
+    if _ML_TRAFFIC_LOADED:
+        return
+    _ML_TRAFFIC_LOADED = True
+    if not ML_WARM_TRAFFIC_PATH.exists():
+        return
+    try:
+        events = json.loads(ML_WARM_TRAFFIC_PATH.read_text())
+        _ML_TRAFFIC.extend((float(ts), str(config)) for ts, config in events)
+    except Exception:
+        pass
+
+
+def _persist_traffic():
+    with _ML_TRAFFIC_LOCK:
+        events = list(_ML_TRAFFIC)
+    try:
+        ML_WARM_TRAFFIC_PATH.parent.mkdir(parents=True, exist_ok=True)
+        ML_WARM_TRAFFIC_PATH.write_text(json.dumps(events))
+    except Exception:
+        pass
+
+
+def record_ml_request(params: dict):
+    """Count one /ml request's configuration (everything but the ticker) for the warm scheduler."""
+    config = json.dumps({field: params.get(field) for field in _WARM_CONFIG_FIELDS}, sort_keys=True)
+    with _ML_TRAFFIC_LOCK:
+        _ensure_traffic_loaded()
+        _ML_TRAFFIC.append((time.time(), config))
+
+
+def _top_ml_configs(limit: int = ML_WARM_TOP_CONFIGS) -> list[tuple[dict, int]]:
+    """The `limit` most requested configurations within ML_WARM_TRAFFIC_WINDOW, with their counts."""
+    cutoff = time.time() - ML_WARM_TRAFFIC_WINDOW
+    with _ML_TRAFFIC_LOCK:
+        _ensure_traffic_loaded()
+        while _ML_TRAFFIC and _ML_TRAFFIC[0][0] < cutoff:
+            _ML_TRAFFIC.popleft()
+        counts = Counter(config for _ts, config in _ML_TRAFFIC)
+    top = []
+    for config, count in counts.most_common(limit):
+        params = json.loads(config)
+        if isinstance(params.get("arima_order"), list):
+            params["arima_order"] = tuple(params["arima_order"])
+        top.append(({k: v for k, v in params.items() if v is not None}, count))
+    return top
+
+
+def request_ml_warm():
+    """Wake the warm scheduler now, e.g. after the watchlist changed."""
+    _WARM_REQUESTED.set()
+
+
+def get_ml_warm_stats() -> dict:
+    return {"top_configs": [count for _config, count in _top_ml_configs()], "last_run": dict(_WARM_STATS)}
+
+
+def _warm_one(ticker: str, config: dict) -> bool:
+    if _cooldown_active():
+        return False
+    try:
+        run_ml_model(
+            ticker=ticker,
+            **config,
+            deadline_ms=0,
+            # Reuse registered fits; only tickers with new bars are refreshed.
+            revalidate=True,
+            background=True,
+        )
+    except Exception:
+        return False
+    return True
+
+
+def warm_ml_cache_for_watchlist(configs: list[dict] | None = None, pooled: bool | None = None):
+    """
+    Warm the ML cache for every watchlist ticker under each of `configs`.
+
+    `configs` defaults to the most requested recent configurations (or
+    ML_WARM_DEFAULT_CONFIG without traffic). Runs ML_WARM_WORKERS at a time;
+    downloads stay serialised by the Yahoo throttle in backend.tools.
+    """
     tickers = _load_watchlist_config()
     if not tickers:
         return
-    yf_period = get_extended_period(period, interval)
-    for ticker in tickers:
-        if _cooldown_active():
-            time.sleep(max(30, _cooldown_remaining_seconds()))
-            break
-        try:
-            run_ml_model(
-                ticker=ticker,
-                period=yf_period,
-                interval=interval,
-                model_type=model_type,
-                pre_days=pre_days,
-                test_days=test_days,
-                ma1=ma1,
-                ma2=ma2,
-                ema1=ema1,
-                arima_order=(5, 1, 0),
-                scaler_type=scaler_type,
-                feature_flags=DEFAULT_FEATURE_FLAGS,
-                use_cache=False,
-            )
-        except YFRateLimitError:
-            time.sleep(60)
-            continue
-        except Exception:
-            continue
-        time.sleep(2)
+    if configs is None:
+        configs = [config for config, _count in _top_ml_configs()] or [
+            ML_WARM_DEFAULT_CONFIG
+            | {"period": get_extended_period(ML_WARM_DEFAULT_CONFIG["period"], ML_WARM_DEFAULT_CONFIG["interval"])}
+        ]
+    pooled = ML_WARM_POOLED if pooled is None else pooled
+    warm_configs = []
+    for config in configs:
+        config = dict(config)
+        if config.get("feature_flags") is None:
+            config["feature_flags"] = DEFAULT_FEATURE_FLAGS
+        if pooled:
+            config.update(pooled=True, scenarios=0)
+        if config.get("pooled"):
+            # One pooled fit, then every watchlist forecast is inference only.
+            try:
+                _pooled_model(
+                    config["period"],
+                    config["interval"],
+                    config["model_type"],
+                    config["pre_days"],
+                    config["ma1"],
+                    config["ma2"],
+                    config["ema1"],
+                    config["feature_flags"],
+                    refresh=True,
+                    background=True,
+                )
+            except Exception:
+                continue
+        warm_configs.append(config)
+
+    started = time.time()
+    tasks = [(ticker, config) for config in warm_configs for ticker in tickers]
+    with ThreadPoolExecutor(max_workers=ML_WARM_WORKERS) as executor:
+        results = list(executor.map(lambda task: _warm_one(*task), tasks))
+    _WARM_STATS.update(
+        started=started,
+        seconds=time.time() - started,
+        configs=len(warm_configs),
+        tickers=len(tickers),
+        warmed=sum(results),
+        failed=len(results) - sum(results),
+    )
+    _persist_traffic()
 
 
 def start_ml_cache_scheduler(interval_seconds: int = 60 * 60 * 24):
     while True:
+        _WARM_REQUESTED.clear()
         try:
             warm_ml_cache_for_watchlist()
         except Exception:
             pass
-        time.sleep(interval_seconds)
+        _WARM_REQUESTED.wait(interval_seconds)
 
 
 class StockPredictionModel:
@@ -268,8 +1384,18 @@ class StockPredictionModel:
         arima_order,
         price_data=None,
         model_params=None,
+        fitted=None,
+        fingerprint=None,
+        strategy="recursive",
     ):
-        """Initialize the StockPredictionModel with parameters and load data."""
+        """
+        Initialize the StockPredictionModel with parameters and load data.
+
+        `fitted` ({"estimator", "scaler"} from the model registry) skips the fit
+        and reuses a previously trained estimator on the same data. With
+        `strategy="direct"` the estimator is fitted on the next `pre_days`
+        closes of every row and projects the whole path in one predict.
+        """
         self.ticker = ticker
         self.period = period
         self.interval = interval
@@ -282,8 +1408,10 @@ class StockPredictionModel:
         self.zoom = zoom
         self.start = start
         self.model_params = model_params or {}
-        self.scaler = self.get_scaler_type()
-        self.model = self.get_model_type()
+        self.strategy = strategy
+        self.fitted = fitted
+        self.scaler = fitted["scaler"] if fitted else self.get_scaler_type()
+        self.model = fitted["estimator"] if fitted else self.get_model_type()
         self.ma1 = ma1
         self.ma2 = ma2
         self.ema1 = ema1
@@ -295,6 +1423,7 @@ class StockPredictionModel:
             self.feature_start = max(self.feature_start, 200)
         self.arima_order = arima_order
         self.feature_keys: list[str] = []
+        self._linear_factor: np.ndarray | None = None
 
         # Load and prepare the data
         if price_data is not None:
@@ -312,62 +1441,16 @@ class StockPredictionModel:
                 self.real_volumes,
             ) = self.load_data()
 
-        # Compute features based on the loaded data
-        self.evaluate_all_features()
+        self.fingerprint = fingerprint or _training_fingerprint(
+            (self.real_prices, self.real_high_prices, self.real_low_prices, self.real_volumes)
+        )
 
         # Build and configure the model
         self.build_model()
 
     def load_data(self):
         """Load ticker data from Yahoo Finance."""
-        try:
-            data = download_prices(
-                self.ticker, period=self.period, interval=self.interval)
-            if data.empty:
-                raise ValueError("No price history returned")
-
-            # yfinance returns single-level columns for one ticker and a
-            # MultiIndex when multiple tickers are requested. Support both
-            # layouts so the ML endpoints work again.
-            if isinstance(data.columns, pd.MultiIndex):
-                try:
-                    subset = data.xs(self.ticker, level=-1, axis=1)
-                except KeyError as exc:
-                    raise ValueError(
-                        f"{self.ticker} not present in downloaded data") from exc
-            else:
-                subset = data
-
-            required = ("Close", "High", "Low", "Volume")
-            missing = [col for col in required if col not in subset.columns]
-            if missing:
-                raise ValueError(f"Missing columns: {', '.join(missing)}")
-
-            prices = subset["Close"]
-            high_prices = subset["High"]
-            low_prices = subset["Low"]
-            volumes = subset["Volume"]
-            return prices, high_prices, low_prices, volumes
-
-        except Exception as e:
-            raise ValueError(f"Error loading data for {self.ticker}: {e}")
-
-    def evaluate_all_features(self):
-        """Compute and store all selected features."""
-        self.ma50 = self.compute_ma(self.real_prices, window=self.ma1)
-        self.ma150 = self.compute_ma(self.real_prices, window=self.ma2)
-        self.ema50 = self.compute_ema(self.real_prices, window=self.ema1)
-        self.momentum = self.compute_momentum(self.real_prices, window=50)
-        self.rsi = self.compute_rsi(self.real_prices)
-        self.upper_band, self.lower_band = self.compute_bollinger_bands(
-            self.real_prices
-        )
-        self.volatility = self.compute_volatility(self.real_prices)
-        self.macd, self.macd_signal = self.compute_macd(self.real_prices)
-        self.atr = self.compute_atr(
-            self.real_high_prices, self.real_low_prices, self.real_prices
-        )
-        self.obv = self.compute_obv(self.real_prices, self.real_volumes)
+        return _load_price_data(self.ticker, self.period, self.interval)
 
     def compute_rsi(self, prices, window=14):
         """Compute the Relative Strength Index (RSI)."""
@@ -480,6 +1563,7 @@ class StockPredictionModel:
         high_prices: list[float],
         low_prices: list[float],
         volumes: list[float],
+        enabled_only: bool = True,
     ) -> dict[str, list[float]]:
         """
         Evaluate key metrics for use as model features.
@@ -489,6 +1573,7 @@ class StockPredictionModel:
             high_prices (list[float]): List of high prices.
             low_prices (list[float]): List of low prices.
             volumes (list[float]): List of trading volumes.
+            enabled_only (bool): Skip the features switched off in `feature_flags`.
 
         Returns:
             dict[str, list[float]]: A dictionary containing computed feature arrays.
@@ -514,19 +1599,22 @@ class StockPredictionModel:
             "obv": lambda: self.compute_obv(prices, volumes),
         }
 
-        # Compute features dynamically
-        computed_features = {name: func() for name, func in features.items()}
+        # Compute only the enabled features
+        computed_features = {
+            name: func() for name, func in features.items() if not enabled_only or self._is_feature_enabled(name)
+        }
 
         # Add aligned macro features (lagged to reduce look-ahead bias)
         macro_df = align_macro_to_index(prices.index, lag_days=1)
         if not macro_df.empty:
             for col in macro_df.columns:
-                computed_features[col] = macro_df[col]
+                if not enabled_only or self._is_feature_enabled(col):
+                    computed_features[col] = macro_df[col]
 
         # Validate feature lengths
         lengths = {name: len(values)
                    for name, values in computed_features.items()}
-        expected_length = next(iter(lengths.values()))
+        expected_length = len(prices)
 
         mismatches = [
             f"{name}: {length} (expected {expected_length})"
@@ -547,91 +1635,100 @@ class StockPredictionModel:
         }
 
     def _flag_for_feature(self, feature_key: str) -> str:
-        for flag, keys in self._feature_flag_groups().items():
-            if feature_key in keys:
-                return flag
-        return feature_key
+        return _flag_for_feature(feature_key)
 
     def _is_feature_enabled(self, feature_key: str) -> bool:
-        if not self.feature_flags:
-            return True
-        flag_key = self._flag_for_feature(feature_key)
-        return bool(self.feature_flags.get(flag_key, True))
-
-    def _apply_feature_flags_to_matrix(self, X: np.ndarray, feature_keys: list[str]) -> np.ndarray:
-        if not self.feature_flags:
-            return X
-        X_weighted = X.copy()
-        for idx, feature_key in enumerate(feature_keys):
-            if not self._is_feature_enabled(feature_key):
-                X_weighted[:, idx] = 0
-        return X_weighted
-
-    def walk_forward_metrics(self, test_days: int) -> dict | None:
+        return _feature_enabled(self.feature_flags, feature_key)
+
+    def enabled_features_key(self) -> tuple:
+        """Hashable form of the feature flags, as far as they select features."""
+        return tuple(sorted((k, bool(v)) for k, v in (self.feature_flags or {}).items()))
+
+    def walk_forward_metrics(
+        self,
+        test_days: int,
+        workers: int | None = None,
+        deadline: float | None = None,
+        progress: Callable[[dict], None] | None = None,
+        fold_cache: dict[int, float] | None = None,
+    ) -> dict | None:
+        """
+        Walk-forward one-step-ahead metrics over the last `test_days` rows.
+
+        Direct models are scored on the first horizon of the path each fold's
+        model forecasts (see `_walk_forward_fold_chunk`). With a `deadline`,
+        folds not reached in time are skipped and the metrics cover only the
+        completed folds (`model.n` < `test_days`). Predictions already in
+        `fold_cache` (fold index -> prediction) are reused.
+        """
         if test_days <= 0:
             return None
         if self.model_type == "ARIMA":
             series = self.real_prices.dropna()
             if len(series) <= test_days + 30:
                 return None
-            start_idx = len(series) - test_days
-            preds, actuals, baseline = [], [], []
-            for i in range(start_idx, len(series)):
-                train_series = series.iloc[:i]
-                model = None
-                try:
-                    from statsmodels.tsa.arima.model import ARIMA
-                    model = ARIMA(train_series, order=self.arima_order).fit()
-                    pred = float(model.forecast(steps=1).iloc[0])
-                except Exception:
-                    pred = float(train_series.iloc[-1])
-                preds.append(pred)
-                actuals.append(float(series.iloc[i]))
-                baseline.append(float(train_series.iloc[-1]))
-            return {
-                "test_days": test_days,
-                "model": _regression_metrics(np.array(actuals), np.array(preds)),
-                "baseline_last": _regression_metrics(np.array(actuals), np.array(baseline)),
+            values = series.to_numpy(dtype=float)
+            folds = list(range(len(values) - test_days, len(values)))
+            inputs = {
+                "folds": folds,
+                "actuals": values[folds],
+                "baseline": values[[i - 1 for i in folds]],
             }
+            # Folds extend one fit anchored at the first fold, so they depend on
+            # test_days and are not shared through fold_cache.
+            preds = _arima_walk_forward(values, self.arima_order, folds, deadline, progress)
+            return _walk_forward_result(test_days, inputs, preds)
 
-        features = self.evaluate_features(
-            prices=self.real_prices,
-            high_prices=self.real_high_prices,
-            low_prices=self.real_low_prices,
-            volumes=self.real_volumes,
-        )
-        feature_keys = list(features.keys())
-        feature_df = pd.concat(features, axis=1)
-        feature_df["target"] = self.real_prices.shift(-1)
-        feature_df["baseline"] = self.real_prices
-        feature_df = feature_df.dropna()
-        if len(feature_df) <= test_days + 30:
+        inputs = self.walk_forward_inputs(test_days)
+        if inputs is None:
             return None
+        # Unscaled LinearRegression keeps the per-fold refit: on raw columns the
+        # refit's solution is numerically different, and metrics must match the
+        # model that is served.
+        if self.model_type == "LinearRegression" and _scaler_kind(self.scaler_type, self.model_type):
+            missing = [i for i in inputs["folds"] if fold_cache is None or i not in fold_cache]
+            preds = _linear_walk_forward(
+                inputs["task"]["X"], inputs["task"]["y"], missing, deadline, progress, lag=inputs["task"]["horizon"] - 1
+            )
+            if fold_cache is not None:
+                fold_cache.update(preds)
+                preds = {i: fold_cache[i] for i in inputs["folds"] if i in fold_cache}
+            return _walk_forward_result(test_days, inputs, preds)
+        preds = _run_cached_folds(_walk_forward_fold_chunk, inputs, workers, deadline, progress, fold_cache)
+        return _walk_forward_result(test_days, inputs, preds)
+
+    def walk_forward_inputs(self, test_days: int, model_types: list[str] | None = None) -> dict | None:
+        """
+        Feature matrix, targets and fold indices for walk-forward validation.
 
-        start_idx = len(feature_df) - test_days
-        preds, actuals, baseline = [], [], []
-        for i in range(start_idx, len(feature_df)):
-            train_df = feature_df.iloc[:i]
-            test_row = feature_df.iloc[i:i + 1]
-            X_train = train_df[feature_keys].values
-            y_train = train_df["target"].values
-            X_test = test_row[feature_keys].values
-            scaler = self.get_scaler_type()
-            if scaler:
-                X_train = scaler.fit_transform(X_train)
-                X_test = scaler.transform(X_test)
-            X_train = self._apply_feature_flags_to_matrix(X_train, feature_keys)
-            X_test = self._apply_feature_flags_to_matrix(X_test, feature_keys)
-            model = self.get_model_type()
-            model.fit(X_train, y_train)
-            pred = float(model.predict(X_test)[0])
-            preds.append(pred)
-            actuals.append(float(test_row["target"].iloc[0]))
-            baseline.append(float(test_row["baseline"].iloc[0]))
+        The returned task carries no fold list or model choice of its own, so
+        the same matrix can be scored for several candidate models; it ships
+        the per-fold scalers every type in `model_types` (default: this
+        model's) needs.
+        """
+        matrix = _training_matrix(self)
+        X = matrix["wf_X"]
+        if len(X) <= test_days + 30:
+            return None
+
+        folds = list(range(len(X) - test_days, len(X)))
+        horizon = self.pre_days if self.strategy == "direct" else 1
+        if folds[0] - horizon + 1 < ML_DIRECT_MIN_ROWS:
+            return None
         return {
-            "test_days": test_days,
-            "model": _regression_metrics(np.array(actuals), np.array(preds)),
-            "baseline_last": _regression_metrics(np.array(actuals), np.array(baseline)),
+            "task": {
+                "X": X,
+                "y": matrix["wf_y"],
+                "fold_scalers": _fold_scalers(matrix, self.scaler_type, model_types or [self.model_type], folds),
+                "scaler_type": self.scaler_type,
+                "model_type": self.model_type,
+                "model_params": self.model_params,
+                "seed": self.seed,
+                "horizon": horizon,
+            },
+            "folds": folds,
+            "actuals": matrix["wf_y"][folds],
+            "baseline": matrix["wf_baseline"][folds],
         }
 
     def build_model(self):
@@ -639,108 +1736,113 @@ class StockPredictionModel:
         Evaluates features and builds training set X (real features) and y (real prices).
         Uses dynamic feature computation for flexibility and scalability.
         """
-        # Initialize lists for features and target values
-        self.X_list, self.y_list = [], []
-
-        # Evaluate features dynamically
-        features = self.evaluate_features(
-            prices=self.real_prices,
-            high_prices=self.real_high_prices,
-            low_prices=self.real_low_prices,
-            volumes=self.real_volumes,
-        )
+        if self.model_type == "ARIMA":
+            # ARIMA models the close series directly; fitting on the raw values
+            # keeps statsmodels off the irregular trading-day index.
+            if not self.fitted:
+                from statsmodels.tsa.arima.model import ARIMA
 
-        # Ensure all feature arrays are aligned
-        self.feature_keys = list(features.keys())
-        feature_values = np.array([features[key] for key in self.feature_keys])
-        if not all(len(arr) == feature_values.shape[1] for arr in feature_values):
-            raise ValueError("Feature lengths are not aligned for training.")
+                self.model = ARIMA(self.real_prices.to_numpy(dtype=float), order=self.arima_order).fit()
+            self.X = None
+            self.X_weighted = None  # Not applicable for ARIMA
+            return
 
-        # Build feature vectors
-        for i in range(self.feature_start - 1, len(self.real_prices)):
-            # Extract the feature vector for the current index
-            feature_vector = feature_values[:, i]
-            self.X_list.append(feature_vector)
-            self.y_list.append(self.real_prices.iloc[i])
+        # Features come from the matrix shared by all models on these bars
+        matrix = _training_matrix(self)
+        self.feature_keys = list(matrix["feature_keys"])
+        feature_values = matrix["values"]
 
-        if not self.X_list:
+        # Build feature vectors from the first row where all features exist
+        X = np.ascontiguousarray(feature_values[:, self.feature_start - 1:].T)
+        y = self.real_prices.to_numpy()[self.feature_start - 1:]
+        if not len(X):
             raise ValueError("Not enough history to build the training set for selected features.")
 
-        # Convert lists to NumPy arrays
-        X = np.array(self.X_list)
-        y = np.array(self.y_list)
-
-        # Save results to CSV
-        results_df = pd.DataFrame(self.X_list)
-        results_df.to_csv(OUTPUT_DIR / "X_list.csv", index=True, header=False)
-
         # Scale features if a scaler is provided
         if self.scaler:
-            print(f"Scaler: {self.scaler}")
-            X_scaled = self.scaler.fit_transform(X)
+            X_scaled = self.scaler.transform(X) if self.fitted else self.scaler.fit_transform(X)
         else:
             X_scaled = X
-            print("Scaler: None")
-
-        # Apply feature weighting if feature_flags are provided
-        if hasattr(self, "feature_flags") and self.feature_flags:
-            X_weighted = X_scaled.copy()
-            for idx, feature_key in enumerate(self.feature_keys):
-                if not self._is_feature_enabled(feature_key):
-                    X_weighted[:, idx] = 0
-        else:
-            X_weighted = X_scaled
 
-        # Save results to CSV
-        results_df = pd.DataFrame(X_weighted)
-        results_df.to_csv(OUTPUT_DIR / "X_weighted.csv", index=True, header=False)
+        # Only enabled features are in the matrix; trees take it as float32
+        X_weighted = _design_matrix(X_scaled, self.model_type)
 
-        # Train the model
-        print(f"Model: {self.model}")
-        if self.model_type == "ARIMA":
-            from statsmodels.tsa.arima.model import ARIMA
+        if self.strategy == "direct":
+            # Row t learns the closes t+1..t+pre_days; the last rows lack a full path
+            y = _horizon_targets(y, self.pre_days)
+            if len(y) < ML_DIRECT_MIN_ROWS:
+                raise ValueError(f"Not enough history for a direct {self.pre_days}-bar forecast.")
 
-            print("Training ARIMA model...")
-            # Example order, tune as needed
-            self.model = ARIMA(self.real_prices, order=self.arima_order)
-            self.model = self.model.fit()
-            self.X_weighted = None  # Not applicable for ARIMA
-        else:
+        # Train the model unless a registered estimator was fitted on this exact data
+        if not self.fitted:
             self.model = self.get_model_type()
-            self.model.fit(X_weighted, y)
+            self.model.fit(X_weighted[: len(y)], y)
 
         # Store results
         self.X = X
         self.X_weighted = X_weighted
 
-    def update_projected_data(self, prices, high_prices, low_prices, volumes, prediction):
+    def linear_factor(self) -> np.ndarray | None:
         """
-        Append a single day of projected data, preserving the DatetimeIndex.
+        R of the QR factorisation of [1, X | y], kept for rank-one refreshes.
+
+        Only scaled, recursive LinearRegression fits have one: on raw columns
+        the QR solution is not the one sklearn fits (see `walk_forward_metrics`).
         """
-        last_date = prices.index[-1]
-        next_date = last_date + pd.Timedelta(days=1)
+        if self.model_type != "LinearRegression" or self.strategy != "recursive" or not self.scaler:
+            return None
+        if self._linear_factor is None:
+            y = self.real_prices.to_numpy(dtype=float)[self.feature_start - 1:]
+            design = np.column_stack([np.ones(len(y)), self.X_weighted, y])
+            if len(design) < design.shape[1]:
+                return None
+            self._linear_factor = np.linalg.qr(design, mode="r")
+        return self._linear_factor
 
-        # carry forward volume
-        volumes = pd.concat(
-            [volumes, pd.Series([volumes.iloc[-1]], index=[next_date])]
-        )
-        # estimate high/low around the prediction
-        high_delta = high_prices.iloc[-1] - prices.iloc[-1]
-        low_delta = prices.iloc[-1] - low_prices.iloc[-1]
-        high_prices = pd.concat(
-            [high_prices, pd.Series(
-                [prediction + high_delta], index=[next_date])]
-        )
-        low_prices = pd.concat(
-            [low_prices, pd.Series(
-                [prediction - low_delta], index=[next_date])]
-        )
-        # append the predicted close
-        prices = pd.concat(
-            [prices, pd.Series([prediction], index=[next_date])]
-        )
+    def refresh_fit(self, new_bars: int, meta: dict) -> str | None:
+        """
+        Update a registered fit for the `new_bars` bars appended since it was trained.
 
-        return prices, high_prices, low_prices, volumes
+        The fit's scaler is kept as is. Returns how the estimator was updated,
+        or None when it needs a full retrain.
+        """
+        if self.strategy != "recursive":
+            return None
+        if self.model_type == "ARIMA":
+            self.model = self.model.append(self.real_prices.to_numpy(dtype=float)[-new_bars:])
+            return "arima_append"
+
+        y = self.real_prices.to_numpy(dtype=float)[self.feature_start - 1:]
+        if isinstance(self.model, XGBRegressor):
+            booster = self.model.get_booster()
+            base_rounds = self.model_params.get("n_estimators", 100)
+            if booster.num_boosted_rounds() + ML_REFRESH_BOOST_ROUNDS > ML_REFRESH_MAX_ROUNDS_FACTOR * base_rounds:
+                return None
+            model = self.get_model_type()
+            model.set_params(n_estimators=ML_REFRESH_BOOST_ROUNDS)
+            model.fit(self.X_weighted, y, xgb_model=booster)
+            self.model = model
+            return "continued_boosting"
+
+        if self.model_type == "LinearRegression":
+            factor = meta.get("linear_factor")
+            if factor is None or not self.scaler:
+                return None
+            R = np.array(factor, dtype=float)
+            for row, target in zip(self.X_weighted[-new_bars:], y[-new_bars:]):
+                _givens_append(R, np.concatenate(([1.0], row, [target])))
+            k = R.shape[0] - 1
+            coef = np.linalg.lstsq(R[:k, :k], R[:k, k], rcond=None)[0]
+            self.model.intercept_ = float(coef[0])
+            self.model.coef_ = coef[1:]
+            self._linear_factor = R
+            return "rank_one_update"
+
+        rmse = ((meta.get("metrics") or {}).get("model") or {}).get("rmse")
+        if not rmse:
+            return None
+        new_rmse = _regression_metrics(y[-new_bars:], self.model.predict(self.X_weighted[-new_bars:]))["rmse"]
+        return "kept" if new_rmse <= ML_REFRESH_DRIFT_RATIO * rmse else None
 
     def get_price_data(self):
         return (
@@ -750,45 +1852,16 @@ class StockPredictionModel:
             self.real_volumes.copy(),
         )
 
-    def recalculate_features(self, prices, high_prices, low_prices, volumes):
-        """
-        Recalculate features dynamically for the given data.
-        """
-        features = self.evaluate_features(
-            prices, high_prices, low_prices, volumes)
-        if self.feature_keys:
-            feature_vector = np.array(
-                [features[key].iloc[-1] for key in self.feature_keys]
-            )
-        else:
-            feature_vector = np.array(
-                [values.iloc[-1] for values in features.values()]
-            )
-        return feature_vector
-
-    def weight_last_feature(self, list, last_feature_vector):
-        # Append feature vector
-        list.append(last_feature_vector)
-        X = np.array(list)
+    def weight_feature_row(self, feature_vector: np.ndarray) -> np.ndarray:
+        """Scale a single raw feature vector into the model's design-matrix row."""
+        return self.weight_feature_rows(np.asarray(feature_vector, dtype=float).reshape(1, -1))[0]
 
-        # Scale and weight features
+    def weight_feature_rows(self, rows: np.ndarray) -> np.ndarray:
+        """Scale raw feature rows into design-matrix rows."""
         if self.scaler:
-            # avoid fit_transform as needs more data than 1 sample
-            X_scaled = self.scaler.transform(X)  # Transform only
-        else:
-            X_scaled = X.copy()
-
-        X_weighted = X_scaled.copy()
-
-        print(f"X_scaled: {X_weighted}")
-
-        for idx, feature_key in enumerate(self.feature_keys):
-            if not self._is_feature_enabled(feature_key):
-                X_weighted[:, idx] = 0
-
-        last_feature_vector = X_weighted[-1]
-
-        return last_feature_vector
+            # Scalers are row-wise, so transforming only the new rows is exact.
+            rows = self.scaler.transform(rows)
+        return _design_matrix(rows, self.model_type)
 
     def iterate_forwards(
         self,
@@ -796,78 +1869,64 @@ class StockPredictionModel:
         high_prices,
         low_prices,
         volumes,
-        X_list,
         last_feature_vector,
         days,
-        name,
+        progress: Callable[[dict], None] | None = None,
+        trace: list | None = None,
     ):
         """
         Iteratively project prices for a given number of days (`pre_days`).
 
+        Each step's design-matrix row is appended to `trace` when given.
+
         Returns:
             pd.Series: Projected prices for the specified number of days.
         """
-
-        results = []
-
+        if self.model_type == "ARIMA":
+            # The whole horizon comes from one multi-step forecast of the fit.
+            forecast = np.asarray(self.model.forecast(steps=days), dtype=float)
+            if progress:
+                progress({"stage": "projection", "step": days, "steps": days})
+            projected = pd.Series(forecast, index=_projection_dates(prices.index, days))
+            return pd.concat([prices, projected])
+
+        if self.strategy == "direct":
+            if days > self.pre_days:
+                raise ValueError(f"Direct model was fitted for {self.pre_days} bars, not {days}.")
+            # The whole path comes from the latest bar's features in one predict.
+            path = np.asarray(self.model.predict(last_feature_vector.reshape(1, -1)), dtype=float)
+            if trace is not None:
+                trace.append(last_feature_vector)
+            if progress:
+                progress({"stage": "projection", "step": days, "steps": days})
+            projected = pd.Series(path[0, :days], index=_projection_dates(prices.index, days))
+            return pd.concat([prices, projected])
+
+        state = ProjectionState(self, prices, high_prices, low_prices, volumes, days)
         for i in range(1, days + 1):
-            print(f"Performing prediction iteration: {i}/{days}")
-
-            if self.model_type == "ARIMA":
-                from statsmodels.tsa.arima.model import ARIMA
-
-                prediction = self.model.forecast(steps=1).iloc[0]
-                print(f"ARIMA forecast output: {prediction}")
-                results.append(prediction)
-                # prices = prices.append(pd.Series([prediction], index=[len(prices)]))
-                prices = pd.concat(
-                    [prices, pd.Series([prediction], index=[len(prices)])]
-                )
-                self.model = ARIMA(prices, order=self.arima_order).fit()
-            else:
-                prediction = self.model.predict([last_feature_vector])[0]
-
-                # Update projected data
-                (
-                    prices,
-                    high_prices,
-                    low_prices,
-                    volumes,
-                ) = self.update_projected_data(
-                    prices, high_prices, low_prices, volumes, prediction
-                )
+            prediction = self.model.predict([last_feature_vector])[0]
 
-                # Recalculate features
-                next_feature_vector = self.recalculate_features(
-                    prices, high_prices, low_prices, volumes
-                )
-
-                # Scale and weight features
-                next_feature_vector = self.weight_last_feature(
-                    X_list, next_feature_vector
-                )
-                last_feature_vector = next_feature_vector
-
-                # Store results
-                row = {
-                    f"{name} Iteration": i,
-                    "Predicted_Price": prediction,
-                    "Last Feature Vector": last_feature_vector,
-                    "New Feature Vector": next_feature_vector,
-                }
+            # Append the projected bar and update only the last feature vector
+            next_feature_vector = self.weight_feature_row(state.step(np.array([prediction]))[0])
+            last_feature_vector = next_feature_vector
+            if trace is not None:
+                trace.append(next_feature_vector)
+            if progress:
+                progress({"stage": "projection", "step": i, "steps": days})
 
-                results.append(row)
-
-        if self.model_type != "ARIMA":
-            # Save results to CSV
-            results_df = pd.DataFrame(results)
-            results_df.to_csv(OUTPUT_DIR / f"{name}_projection_results.csv", index=False)
-
-        return prices
+        return state.projected_prices()
 
-    def iterate_projections(self) -> pd.Series:
+    def iterate_projections(
+        self,
+        days: int | None = None,
+        progress: Callable[[dict], None] | None = None,
+        trace: list | None = None,
+    ) -> pd.Series:
         """
-        Iteratively project prices for a given number of days (`pre_days`).
+        Iteratively project prices for `days` days (default `pre_days`).
+
+        Projection leaves the fitted model untouched, so one fit can serve
+        several horizons. `trace` collects the per-step design-matrix rows.
 
         Returns:
             pd.Series: Projected prices for the specified number of days.
@@ -879,63 +1938,250 @@ class StockPredictionModel:
         volumes = self.real_volumes.copy()
 
         # Initialize features
-        X_list = self.X_list.copy()
-        last_feature_vector = self.X_weighted[-1].copy()
-        days = self.pre_days
-        name = "Projected"
+        last_feature_vector = self.X_weighted[-1].copy() if self.X_weighted is not None else None
+        days = self.pre_days if days is None else days
 
         prices = self.iterate_forwards(
             prices,
             high_prices,
             low_prices,
             volumes,
-            X_list,
             last_feature_vector,
             days,
-            name,
+            progress=progress,
+            trace=trace,
         )
 
         return prices
 
+    def iterate_scenarios(
+        self,
+        days: int,
+        paths: int,
+        residuals: list[float],
+        progress: Callable[[dict], None] | None = None,
+    ) -> np.ndarray:
+        """
+        Simulate `paths` projections of `days` bars, perturbed by bootstrapped residuals.
+
+        Recursive projections add a resampled one-step residual to every
+        predicted close and feed it back through the features. ARIMA and direct
+        paths come from one forecast, so the residuals accumulate on top of it.
+
+        Returns:
+            np.ndarray: Simulated closes, shape (paths, days).
+        """
+        rng = np.random.default_rng(self.seed)
+        noise = rng.choice(np.asarray(residuals, dtype=float), size=(paths, days))
+        if self.model_type == "ARIMA" or self.strategy == "direct":
+            path = self.iterate_projections(days=days).to_numpy(dtype=float)[-days:]
+            if progress:
+                progress({"stage": "scenarios", "step": days, "steps": days})
+            return path + np.cumsum(noise, axis=1)
+
+        state = ProjectionState(
+            self,
+            self.real_prices,
+            self.real_high_prices,
+            self.real_low_prices,
+            self.real_volumes,
+            days,
+            paths=paths,
+        )
+        rows = np.repeat(self.X_weighted[-1:], paths, axis=0)
+        for i in range(days):
+            predictions = self.model.predict(rows) + noise[:, i]
+            rows = self.weight_feature_rows(state.step(predictions))
+            if progress:
+                progress({"stage": "scenarios", "step": i + 1, "steps": days})
+        return state.projected_paths()
+
     def get_scaler_type(self):
         """Returns the appropriate scaler based on user input."""
-        if self.scaler_type == "auto":
-            if self.model_type in {"XGBoost", "RandomForest", "GBR", "ARIMA"}:
-                return None
-            return StandardScaler()
-        if self.scaler_type == "minmax":
-            return MinMaxScaler(feature_range=(-1, 1))
-        elif self.scaler_type == "standard":
-            return StandardScaler()
-        elif self.scaler_type == "none":
-            return None
-        else:
-            raise ValueError(f"Unknown scaler type: {self.scaler_type}")
+        return _make_scaler(self.scaler_type, self.model_type)
 
     def get_model_type(self):
         """Returns the appropriate model based on user input."""
-        if self.model_type == "XGBoost":
-            params = {"random_state": self.seed}
-            params.update(self.model_params or {})
-            return XGBRegressor(**params)
-        elif self.model_type == "RandomForest":
-            params = {"random_state": self.seed}
-            params.update(self.model_params or {})
-            return RandomForestRegressor(**params)
-        elif self.model_type == "GBR":
-            params = {"random_state": self.seed}
-            params.update(self.model_params or {})
-            return GradientBoostingRegressor(**params)
-        elif self.model_type == "LinearRegression":
-            return LinearRegression()
-        elif self.model_type == "ARIMA":
-            return None  # ARIMA doesn't require initialization here
+        if self.strategy == "direct":
+            return _make_direct_model(self.model_type, self.seed, self.model_params, n_jobs=ML_TRAINING_THREADS)
+        return _make_model(self.model_type, self.seed, self.model_params, n_jobs=ML_TRAINING_THREADS)
+
+
+def _projection_dates(index: pd.Index, days: int) -> pd.DatetimeIndex:
+    """Calendar days following the last date of `index`."""
+    return pd.DatetimeIndex([index[-1] + pd.Timedelta(days=i) for i in range(1, days + 1)])
+
+
+class ProjectionState:
+    """
+    Preallocated price arrays and rolling indicator state for the recursive
+    projection of one or more paths.
+
+    Mirrors `StockPredictionModel.evaluate_features`, but each `step` appends
+    one projected bar per path and computes only the feature rows for that
+    bar. EMA, MACD and OBV carry O(1) state; rolling-window features read a
+    fixed-size slice of the preallocated arrays, which keep only the history
+    the longest window needs. Macro rows for all projected dates are aligned
+    once up front (alignment is causal, so this matches per-step alignment).
+    """
+
+    def __init__(
+        self,
+        model: StockPredictionModel,
+        prices,
+        high_prices,
+        low_prices,
+        volumes,
+        days: int,
+        paths: int = 1,
+    ):
+        self.model = model
+        self.size = len(prices)
+        # Rolling windows look back at most this far (plus the previous close)
+        keep = min(self.size, max(model.ma1, model.ma2, 200) + 1)
+        self.offset = self.size - keep
+        capacity = keep + days
+        self.close = np.empty((paths, capacity))
+        self.high = np.empty((paths, capacity))
+        self.low = np.empty((paths, capacity))
+        self.volume = np.empty((paths, capacity))
+        self.close[:, :keep] = prices.to_numpy(dtype=float)[self.offset:]
+        self.high[:, :keep] = high_prices.to_numpy(dtype=float)[self.offset:]
+        self.low[:, :keep] = low_prices.to_numpy(dtype=float)[self.offset:]
+        self.volume[:, :keep] = volumes.to_numpy(dtype=float)[self.offset:]
+
+        # The projected high/low keep the last real bar's spread around the close.
+        self.high_delta = self.high[0, keep - 1] - self.close[0, keep - 1]
+        self.low_delta = self.close[0, keep - 1] - self.low[0, keep - 1]
+
+        self.history = prices
+        self.dates = _projection_dates(prices.index, days)
+
+        self.ema_spans = {"ema50": model.ema1, "ema_short": 12, "ema_long": 26}
+        self.ema = {
+            key: np.full(paths, float(prices.ewm(span=span, adjust=False).mean().iloc[-1]))
+            for key, span in self.ema_spans.items()
+        }
+        macd, signal = model.compute_macd(prices)
+        self.macd_signal = np.full(paths, float(signal.iloc[-1]))
+        self.obv = np.full(paths, float(model.compute_obv(prices, volumes).iloc[-1]))
+
+        macro_df = align_macro_to_index(prices.index.append(self.dates), lag_days=1)
+        if macro_df.empty:
+            self.macro_columns: list[str] = []
+            self.macro_values = np.empty((days, 0))
         else:
-            raise ValueError(f"Unknown model type: {self.model_type}")
+            self.macro_columns = list(macro_df.columns)
+            self.macro_values = macro_df.iloc[self.size:].to_numpy(dtype=float)
+        self.step_idx = 0
+
+    @staticmethod
+    def _ema_update(prev: np.ndarray, value: np.ndarray, span: int) -> np.ndarray:
+        alpha = 2.0 / (span + 1.0)
+        return alpha * value + (1.0 - alpha) * prev
+
+    def _window(self, values: np.ndarray, window: int) -> np.ndarray | None:
+        if self.size < window:
+            return None
+        end = self.size - self.offset
+        return values[:, end - window: end]
+
+    def _rolling_mean(self, values: np.ndarray, window: int) -> np.ndarray | float:
+        tail = self._window(values, window)
+        return np.mean(tail, axis=1) if tail is not None else np.nan
+
+    def _rolling_std(self, values: np.ndarray, window: int) -> np.ndarray | float:
+        tail = self._window(values, window)
+        return np.std(tail, axis=1, ddof=1) if tail is not None else np.nan
+
+    def step(self, predictions: np.ndarray) -> np.ndarray:
+        """Append one projected bar per path and return their raw (unscaled) feature rows."""
+        predictions = np.asarray(predictions, dtype=float)
+        t = self.size - self.offset
+        prev_close = self.close[:, t - 1]
+        self.close[:, t] = predictions
+        self.high[:, t] = predictions + self.high_delta
+        self.low[:, t] = predictions - self.low_delta
+        # carry forward volume
+        self.volume[:, t] = self.volume[:, t - 1]
+        self.size += 1
+
+        for key, span in self.ema_spans.items():
+            self.ema[key] = self._ema_update(self.ema[key], predictions, span)
+        macd = self.ema["ema_short"] - self.ema["ema_long"]
+        self.macd_signal = self._ema_update(self.macd_signal, macd, 9)
+        volume = self.volume[:, t]
+        self.obv = np.where(
+            predictions > prev_close,
+            self.obv + volume,
+            np.where(predictions < prev_close, self.obv - volume, self.obv),
+        )
+
+        model = self.model
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.size > 5:
+                momentum = (predictions - self.close[:, t - 5]) / self.close[:, t - 5]
+            else:
+                momentum = np.nan
+
+            if self.size > 14:
+                deltas = np.diff(self.close[:, t - 14: t + 1], axis=1)
+                avg_gain = np.mean(np.clip(deltas, 0, None), axis=1)
+                avg_loss = np.mean(-np.clip(deltas, None, 0), axis=1)
+                rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+            else:
+                rsi = np.nan
+
+            band_mean = self._rolling_mean(self.close, 50)
+            band_std = self._rolling_std(self.close, 50)
+
+            if self.size > 14:
+                highs = self.high[:, t - 13: t + 1]
+                lows = self.low[:, t - 13: t + 1]
+                prev_closes = self.close[:, t - 14: t]
+                tr = np.maximum(highs - lows, np.maximum(np.abs(highs - prev_closes), np.abs(lows - prev_closes)))
+                atr = np.mean(tr, axis=1)
+            else:
+                atr = np.nan
+
+        values = {
+            "ma50": self._rolling_mean(self.close, model.ma1),
+            "ma100": self._rolling_mean(self.close, 100),
+            "ma150": self._rolling_mean(self.close, model.ma2),
+            "ma200": self._rolling_mean(self.close, 200),
+            "ema50": self.ema["ema50"],
+            "momentum": momentum,
+            "rsi": rsi,
+            "upper_band": band_mean + band_std * 2,
+            "lower_band": band_mean - band_std * 2,
+            "volatility": band_std,
+            "macd": macd,
+            "macd_signal": self.macd_signal,
+            "atr": atr,
+            "obv": self.obv,
+        }
+        macro_row = self.macro_values[self.step_idx]
+        for idx, col in enumerate(self.macro_columns):
+            values[col] = macro_row[idx]
+        self.step_idx += 1
+        rows = np.empty((len(predictions), len(model.feature_keys)))
+        for idx, key in enumerate(model.feature_keys):
+            rows[:, idx] = values[key]
+        return rows
+
+    def projected_paths(self) -> np.ndarray:
+        """Projected closes so far, one row per path."""
+        start = len(self.history) - self.offset
+        return self.close[:, start: self.size - self.offset]
+
+    def projected_prices(self) -> pd.Series:
+        """History plus the projected closes of the first path, on a DatetimeIndex."""
+        projected = pd.Series(self.projected_paths()[0], index=self.dates[: self.step_idx])
+        return pd.concat([self.history, projected])
 
 
 def get_available_models():
-    return ["XGBoost", "RandomForest", "GBR", "LinearRegression", "ARIMA"]
+    return ["XGBoost", "RandomForest", "GBR", "HistGBR", "LinearRegression", "ARIMA"]
 
 
 def run_ml_model(
@@ -948,11 +2194,69 @@ def run_ml_model(
     ma1: int,
     ma2: int,
     ema1: int,
-    arima_order: tuple[int, int, int],
+    arima_order: tuple[int, int, int] | str,
     scaler_type: str,
     feature_flags: dict,
     use_cache: bool = True,
+    deadline_ms: int | None = None,
+    progress: Callable[[dict], None] | None = None,
+    run_id: str | None = None,
+    strategy: str = "recursive",
+    scenarios: int = 0,
+    pooled: bool = False,
+    revalidate: bool = False,
+    background: bool = False,
 ):
+    """
+    Train, validate and project a forecast for `ticker`.
+
+    `deadline_ms` bounds the request (None uses ML_DEFAULT_DEADLINE_MS, 0
+    disables it). Walk-forward folds and auto-tune rungs stop once it passes;
+    the best model found so far is returned with `partial: True` and is not
+    cached. `progress` receives stage events (training, walk_forward fold i/n,
+    auto_tune candidate, projection step) as the run advances.
+
+    Complete fits are persisted to the model registry keyed by config and a
+    fingerprint of the training data, so an unchanged request (even after a
+    restart or on another worker) skips straight to the projection.
+    `use_cache=False` bypasses both the result cache and the registry.
+    When the bars only gained new rows since the registered fit, that fit is
+    updated incrementally (see ML_REFRESH_*) and `refreshed` says how.
+    `revalidate=True` skips the result cache but keeps the registry, so an
+    unchanged config is reprojected and a changed one refreshed.
+
+    `arima_order="auto"` picks the ARIMA order by AIC (see `_auto_arima_order`)
+    and reports the choice in `search`.
+
+    With artifacts enabled, the winning model's design matrix and projection
+    trace are written in the background under `run_id` (a fresh id if None).
+
+    `strategy="direct"` projects the `pre_days` path with one multi-output
+    predict instead of feeding daily predictions back through the features
+    (ARIMA always forecasts its path directly). Walk-forward metrics score the
+    one-bar-ahead forecast in both strategies.
+
+    `scenarios=N` also simulates N projections perturbed by bootstrapped
+    walk-forward residuals and returns their percentiles as `bands`.
+
+    `pooled=True` serves the forecast from the pooled cross-ticker model (see
+    `_pooled_model`) by inference only: no per-ticker fit, walk-forward or
+    bands, so `scenarios` is rejected and the parameters it does not use are
+    listed in `ignored`. The pooled fit itself is refreshed by the daily
+    warm-up or once it is older than ML_POOLED_TTL; `use_cache=False` only
+    bypasses the result cache.
+
+    Fits run within the training budget (see backend.budget): `budget` reports
+    the queue and run time of this request's training, None when none was
+    needed. TrainingBusy is raised when the request is shed; `background`
+    queues behind interactive requests instead.
+    """
+    if strategy not in ML_STRATEGIES:
+        raise ValueError(f"Unknown strategy: {strategy}")
+    if not 0 <= scenarios <= ML_SCENARIO_MAX_PATHS:
+        raise ValueError(f"scenarios must be between 0 and {ML_SCENARIO_MAX_PATHS}.")
+    if pooled and scenarios:
+        raise ValueError("Scenario bands are not available for pooled models.")
 
     cache_key = _cache_key(
         ticker,
@@ -967,15 +2271,111 @@ def run_ml_model(
         arima_order,
         scaler_type,
         feature_flags,
+        strategy,
+        pooled,
+        scenarios,
     )
-    if use_cache:
+    if use_cache and not revalidate:
         cached = _cache_get(cache_key)
         if cached:
             return cached | {"cached": True}
 
-    def _train_model(selected_model: str, price_data=None, model_params: dict | None = None):
-        start_val = max(ma1, ma2, ema1)
-        model = StockPredictionModel(
+    # Concurrent identical requests coalesce onto one run. A request that asked
+    # to retrain never joins one that may reuse the registry, and a coalesced
+    # caller stops waiting at its own deadline, or rejects a partial result
+    # while it has time left, and runs itself (see `_singleflight_call`).
+    deadline = _resolve_deadline(deadline_ms)
+    flight_key = ("ml",) + cache_key + (use_cache,)
+    wait_timeout = None if deadline is None else deadline - time.time()
+
+    def _accept(payload: dict) -> bool:
+        return not payload.get("partial") or _deadline_passed(deadline)
+
+    if pooled:
+        return _singleflight_call(
+            flight_key,
+            _pooled_forecast,
+            (cache_key,),
+            dict(
+                ticker=ticker,
+                period=period,
+                interval=interval,
+                model_type=model_type,
+                pre_days=pre_days,
+                ma1=ma1,
+                ma2=ma2,
+                ema1=ema1,
+                feature_flags=feature_flags,
+                progress=progress,
+                background=background,
+                ignored=_pooled_ignored(test_days, scaler_type, strategy),
+            ),
+            wait_timeout,
+            _accept,
+        )
+
+    return _singleflight_call(
+        flight_key,
+        _train_and_project,
+        (cache_key,),
+        dict(
+            ticker=ticker,
+            period=period,
+            interval=interval,
+            model_type=model_type,
+            pre_days=pre_days,
+            test_days=test_days,
+            ma1=ma1,
+            ma2=ma2,
+            ema1=ema1,
+            arima_order=arima_order,
+            scaler_type=scaler_type,
+            feature_flags=feature_flags,
+            use_cache=use_cache,
+            deadline=deadline,
+            progress=progress,
+            run_id=run_id,
+            strategy=strategy,
+            scenarios=scenarios,
+            background=background,
+        ),
+        wait_timeout,
+        _accept,
+    )
+
+
+def get_ml_singleflight_stats() -> dict:
+    """Leader runs, requests coalesced onto an identical run, and those that fell back to their own."""
+    return get_singleflight_stats("ml")
+
+
+def _train_and_project(
+    cache_key: tuple,
+    ticker: str,
+    period: str,
+    interval: str,
+    model_type: str,
+    pre_days: int,
+    test_days: int,
+    ma1: int,
+    ma2: int,
+    ema1: int,
+    arima_order: tuple[int, int, int] | str,
+    scaler_type: str,
+    feature_flags: dict,
+    use_cache: bool,
+    deadline: float | None,
+    progress: Callable[[dict], None] | None,
+    run_id: str | None,
+    strategy: str,
+    scenarios: int,
+    background: bool,
+) -> dict:
+    # Scenario count only shapes the output; fits are shared across it.
+    fit_key = cache_key[:-1]
+
+    def _model_kwargs(selected_model: str) -> dict:
+        return dict(
             ticker=ticker,
             period=period,
             interval=interval,
@@ -986,92 +2386,575 @@ def run_ml_model(
             scaler_type=scaler_type,
             model_type=selected_model,
             zoom=pre_days,
-            start=start_val,
+            start=max(ma1, ma2, ema1),
             ma1=ma1,
             ma2=ma2,
             ema1=ema1,
             arima_order=arima_order,
+            strategy=strategy,
+        )
+
+    price_data = _load_price_data(ticker, period, interval)
+    fingerprint = _training_fingerprint(price_data)
+    # In-memory caches key on every macro column (the walk-forward rows depend
+    # on them all); registry entries only on the ones the fit reads.
+    registry_fingerprint = _training_fingerprint(price_data, feature_flags or {})
+    warm = _warm_pool_entry(fit_key, fingerprint, reset=not use_cache)
+    # Direct folds are fitted on horizon paths, so they are shared per horizon only.
+    horizon_folds = warm["folds"].setdefault(("direct", pre_days) if strategy == "direct" else (), {})
+
+    def _fit(selected_model: str, model_params: dict | None):
+        if progress:
+            progress({"stage": "training", "model": selected_model})
+        return StockPredictionModel(
+            **_model_kwargs(selected_model),
             price_data=price_data,
             model_params=model_params,
+            fingerprint=fingerprint,
+        )
+
+    def _fitted_model(selected_model: str, model_params: dict | None = None):
+        # Fits are shared across horizons; concurrent requests wait for one fit.
+        model_key = (selected_model, _params_key(model_params))
+        if selected_model == "ARIMA":
+            # "auto" resolves per search, so key on the order actually fitted.
+            model_key += (arima_order,)
+        elif strategy == "direct":
+            # Direct fits are horizon-specific.
+            model_key += (pre_days,)
+        model = warm["models"].get(model_key)
+        if model is None:
+            model = _singleflight_call(
+                ("ml_fit",) + warm["key"] + model_key,
+                _fit,
+                (selected_model, model_params),
+                wait_timeout=None if deadline is None else deadline - time.time(),
+            )
+            warm["models"][model_key] = model
+        return model
+
+    def _project(model):
+        trace = [] if artifacts_enabled() else None
+        return model.iterate_projections(days=pre_days, progress=progress, trace=trace), trace
+
+    def _train_model(selected_model: str):
+        model = _fitted_model(selected_model)
+        preds, trace = _project(model)
+        metrics = model.walk_forward_metrics(
+            test_days=test_days,
+            deadline=deadline,
+            progress=progress,
+            fold_cache=horizon_folds.setdefault((selected_model, _params_key(None)), {}),
         )
-        preds = model.iterate_projections()
-        metrics = model.walk_forward_metrics(test_days=test_days)
         validation = _build_validation(metrics)
-        return model, preds, metrics, validation
+        return model, preds, trace, metrics, validation
 
-    base_model, base_preds, base_metrics, base_validation = _train_model(model_type)
-    best = {
-        "model_type": model_type,
-        "model": base_model,
-        "preds": base_preds,
-        "metrics": base_metrics,
-        "validation": base_validation,
-        "params": None,
-    }
-    auto_retrained = False
-    tuned = False
-    search_summary = None
-
-    if model_type != "ARIMA" and base_validation and not base_validation.get("passed", True):
-        price_data = base_model.get_price_data()
-        best_rmse = base_metrics.get("model", {}).get("rmse", float("inf")) if base_metrics else float("inf")
-        for candidate in AUTO_MODEL_POOL:
-            if candidate == model_type:
-                continue
-            grid = _param_grid(candidate)
-            total_candidates = len(grid)
-            local_best = None
-            local_best_rmse = float("inf")
-            local_best_metrics = None
-            local_best_validation = None
-            local_best_params = None
-            for params in grid:
+    def _registered_model(registered: dict):
+        meta = registered["meta"]
+        try:
+            model = StockPredictionModel(
+                **_model_kwargs(meta["model_used"]),
+                price_data=price_data,
+                model_params=meta["params"],
+                fitted=registered,
+                fingerprint=fingerprint,
+            )
+        except Exception:
+            return None
+        # Entries written for another feature layout are retrained and replaced.
+        return model if model.feature_keys == meta.get("feature_keys") else None
+
+    def _bands(model, residuals: list[float] | None) -> dict | None:
+        if not scenarios or not residuals:
+            return None
+        return _scenario_bands(model, pre_days, scenarios, residuals, progress)
+
+    def _refreshed_model(previous: dict):
+        # Only a fit whose bars are a prefix of today's can be updated in place.
+        meta = previous["meta"]
+        bars = meta.get("bars")
+        if not bars or meta.get("refreshes", 0) >= ML_REFRESH_MAX_CHAIN:
+            return None, None
+        new_bars = len(price_data[0]) - bars
+        if not 0 < new_bars <= ML_REFRESH_MAX_NEW_BARS:
+            return None, None
+        prefix = tuple(series.iloc[:bars] for series in price_data)
+        if _training_fingerprint(prefix, feature_flags or {}) != meta["fingerprint"]:
+            return None, None
+        model = _registered_model(previous)
+        if model is None:
+            return None, None
+        try:
+            method = model.refresh_fit(new_bars, meta)
+        except Exception:
+            return None, None
+        if method is None:
+            return None, None
+        return model, {"method": method, "new_bars": new_bars, "refreshes": meta.get("refreshes", 0) + 1}
+
+    registered = registry_get(fit_key, registry_fingerprint) if use_cache else None
+    model = _registered_model(registered) if registered is not None else None
+    refreshed = None
+    if model is None and use_cache:
+        previous = registry_latest(fit_key)
+        if previous is not None:
+            model, refreshed = _refreshed_model(previous)
+            registered = previous if model is not None else None
+    if model is not None:
+        # Same config, same or extended bars: reuse the registered fit and only project.
+        meta = registered["meta"]
+        if progress:
+            progress({"stage": "refresh" if refreshed else "registry", "model": meta["model_used"]})
+        if refreshed:
+            registry_put(
+                fit_key,
+                registry_fingerprint,
+                model.model,
+                model.scaler,
+                _registry_meta(model, meta, refreshes=refreshed["refreshes"]),
+            )
+        warm["models"].setdefault((meta["model_used"], _params_key(meta["params"])), model)
+        predictions, trace = _project(model)
+        payload = {
+            "projected": {
+                "Date": predictions.index.astype(str).tolist(),
+                "Predicted": predictions.tolist(),
+            },
+            "bands": _bands(model, meta.get("residuals")),
+            "metrics": meta["metrics"],
+            "validation": meta["validation"],
+            "requested_model": model_type,
+            "model_used": meta["model_used"],
+            "auto_retrained": meta["auto_retrained"],
+            "tuned": meta["tuned"],
+            "search": meta["search"],
+            "strategy": strategy,
+            "refreshed": refreshed,
+            "budget": None,
+            "partial": False,
+        }
+        _cache_set(cache_key, payload)
+        _record_artifacts(run_id, model, trace, payload)
+        return payload
+
+    # Everything below fits models, so it runs within the training budget.
+    with training_slot(f"{ticker} {model_type}", deadline, progress, background) as slot:
+        arima_search = None
+        if model_type == "ARIMA" and arima_order == "auto":
+            arima_order, arima_search = _auto_arima_order(
+                ticker, interval, price_data[0].dropna().to_numpy(dtype=float), deadline, progress
+            )
+
+        base_model, base_preds, base_trace, base_metrics, base_validation = _train_model(model_type)
+        best = {
+            "model_type": model_type,
+            "model": base_model,
+            "preds": base_preds,
+            "trace": base_trace,
+            "metrics": base_metrics,
+            "validation": base_validation,
+            "params": None,
+        }
+        auto_retrained = False
+        tuned = arima_search is not None
+        search_summary = arima_search
+        if base_metrics:
+            partial = base_metrics["model"].get("n", 0) < test_days
+        else:
+            partial = _deadline_passed(deadline)
+        if arima_search and not arima_search["complete"]:
+            partial = True
+
+        needs_tuning = model_type != "ARIMA" and base_validation and not base_validation.get("passed", True)
+        if needs_tuning and _deadline_passed(deadline):
+            partial = True
+        elif needs_tuning:
+            best_rmse = base_metrics.get("model", {}).get("rmse", float("inf")) if base_metrics else float("inf")
+            candidates = [
+                (candidate, params)
+                for candidate in AUTO_MODEL_POOL
+                if candidate != model_type
+                for params in _param_grid(candidate)
+            ]
+            inputs = base_model.walk_forward_inputs(test_days, model_types=AUTO_MODEL_POOL)
+            tuning_key = _tuning_key(ticker, interval, ma1, ma2, ema1, scaler_type, feature_flags)
+            remembered = _remembered_tuning(tuning_key, len(price_data[0])) if inputs else None
+            result = None
+            if remembered:
+                # Start from the last winner; a full search only if it stopped holding up.
+                if progress:
+                    progress({"stage": "auto_tune", "remembered": True, "model": remembered["model_type"]})
+                result = _successive_halving(
+                    inputs,
+                    [(remembered["model_type"], remembered["params"])],
+                    test_days,
+                    deadline,
+                    progress,
+                    fold_cache=horizon_folds,
+                )
+                if not _tuning_holds(result, remembered) and not _deadline_passed(deadline):
+                    remembered, result = None, None
+            if result is None and inputs:
+                result = _successive_halving(inputs, candidates, test_days, deadline, progress, fold_cache=horizon_folds)
+                if result and result["complete"] and result["metrics"]:
+                    _remember_tuning(tuning_key, result, len(price_data[0]))
+            if result is None or not result["complete"]:
+                partial = partial or _deadline_passed(deadline)
+            cand_rmse = result["metrics"]["model"].get("rmse", float("inf")) if result else float("inf")
+            if result and cand_rmse < best_rmse and _deadline_passed(deadline):
+                # No time left to refit the winner; keep the projected base model.
+                partial = True
+            elif result and cand_rmse < best_rmse:
+                # Only the winner is refitted on the full history and projected.
                 try:
-                    cand_model, cand_preds, cand_metrics, cand_validation = _train_model(
-                        candidate, price_data=price_data, model_params=params
-                    )
+                    cand_model = _fitted_model(result["model_type"], result["params"])
+                    cand_preds, cand_trace = _project(cand_model)
                 except Exception:
-                    continue
-                cand_rmse = cand_metrics.get("model", {}).get("rmse", float("inf")) if cand_metrics else float("inf")
-                if cand_rmse < local_best_rmse:
-                    local_best_rmse = cand_rmse
-                    local_best = (cand_model, cand_preds)
-                    local_best_metrics = cand_metrics
-                    local_best_validation = cand_validation
-                    local_best_params = params
-            if local_best and local_best_rmse < best_rmse:
-                best_rmse = local_best_rmse
-                best = {
-                    "model_type": candidate,
-                    "model": local_best[0],
-                    "preds": local_best[1],
-                    "metrics": local_best_metrics,
-                    "validation": local_best_validation,
-                    "params": local_best_params,
-                }
-                auto_retrained = True
-                tuned = True
-                search_summary = {
-                    "searched": True,
-                    "model": candidate,
-                    "candidates": total_candidates,
-                    "best_params": local_best_params,
-                }
-
-    predictions = best["preds"]
+                    cand_model = None
+                if cand_model is not None:
+                    best = {
+                        "model_type": result["model_type"],
+                        "model": cand_model,
+                        "preds": cand_preds,
+                        "trace": cand_trace,
+                        "metrics": result["metrics"],
+                        "validation": _build_validation(result["metrics"]),
+                        "params": result["params"],
+                    }
+                    auto_retrained = True
+                    tuned = True
+                    search_summary = {
+                        "searched": not remembered,
+                        "remembered": bool(remembered),
+                        "model": result["model_type"],
+                        "candidates": result["candidates"],
+                        "best_params": result["params"],
+                        "rungs": result["rungs"],
+                        "fits": result["fits"],
+                    }
+
+        predictions = best["preds"]
+        metrics, residuals = _split_residuals(best["metrics"])
+        bands = None
+        if scenarios and residuals and _deadline_passed(deadline):
+            partial = True
+        else:
+            bands = _bands(best["model"], residuals)
 
     payload = {
         "projected": {
             "Date": predictions.index.astype(str).tolist(),
             "Predicted": predictions.tolist(),
         },
-        "metrics": best["metrics"],
+        "bands": bands,
+        "metrics": metrics,
         "validation": best["validation"],
         "requested_model": model_type,
         "model_used": best["model_type"],
         "auto_retrained": auto_retrained,
         "tuned": tuned,
         "search": search_summary,
+        "strategy": strategy,
+        "refreshed": None,
+        "budget": slot,
+        "partial": partial,
+    }
+    if not partial:
+        _cache_set(cache_key, payload)
+        registry_put(
+            fit_key,
+            registry_fingerprint,
+            best["model"].model,
+            best["model"].scaler,
+            _registry_meta(
+                best["model"],
+                {
+                    "model_used": best["model_type"],
+                    "params": best["params"],
+                    "metrics": metrics,
+                    "residuals": residuals,
+                    "validation": best["validation"],
+                    "auto_retrained": auto_retrained,
+                    "tuned": tuned,
+                    "search": search_summary,
+                },
+            ),
+        )
+    _record_artifacts(run_id, best["model"], best["trace"], payload)
+    return payload
+
+
+def _registry_meta(model: StockPredictionModel, fit_meta: dict, refreshes: int = 0) -> dict:
+    """Registry meta for `model`: how it was chosen (`fit_meta`) plus what a refresh needs."""
+    factor = model.linear_factor()
+    return {
+        "model_used": fit_meta["model_used"],
+        "params": fit_meta["params"],
+        "feature_keys": model.feature_keys,
+        "metrics": fit_meta["metrics"],
+        "residuals": fit_meta.get("residuals"),
+        "validation": fit_meta["validation"],
+        "auto_retrained": fit_meta["auto_retrained"],
+        "tuned": fit_meta["tuned"],
+        "search": fit_meta["search"],
+        "bars": len(model.real_prices),
+        "refreshes": refreshes,
+        "linear_factor": factor.tolist() if factor is not None else None,
+    }
+
+
+def _record_artifacts(run_id: str | None, model: StockPredictionModel, trace: list | None, payload: dict):
+    """Queue the winning model's design matrices and projection trace for the artifact writer."""
+    if not artifacts_enabled():
+        return
+    save_artifacts(
+        run_id or uuid.uuid4().hex,
+        {
+            "ticker": model.ticker,
+            "model_used": payload["model_used"],
+            "model_params": model.model_params,
+            "feature_keys": model.feature_keys,
+            "metrics": payload["metrics"],
+            "partial": payload["partial"],
+        },
+        X=model.X,
+        design=model.X_weighted,
+        projection=np.asarray(trace) if trace else None,
+        predicted=np.asarray(payload["projected"]["Predicted"], dtype=float),
+    )
+
+
+def _pooled_universe() -> list[str]:
+    if ML_POOLED_UNIVERSE == "sp500":
+        return [ticker.upper() for ticker in _load_sp500_universe()]
+    return _load_watchlist_config()
+
+
+def _feature_model(
+    ticker: str,
+    period: str,
+    interval: str,
+    model_type: str,
+    pre_days: int,
+    ma1: int,
+    ma2: int,
+    ema1: int,
+    feature_flags: dict,
+) -> StockPredictionModel:
+    """`ticker`'s features on its own bars, without fitting an estimator."""
+    return StockPredictionModel(
+        ticker=ticker,
+        period=period,
+        interval=interval,
+        pre_days=pre_days,
+        test_days=0,
+        seed=42,
+        feature_flags=feature_flags,
+        scaler_type="none",
+        model_type=model_type,
+        zoom=pre_days,
+        start=max(ma1, ma2, ema1),
+        ma1=ma1,
+        ma2=ma2,
+        ema1=ema1,
+        arima_order=None,
+        price_data=_load_price_data(ticker, period, interval),
+        fitted={"estimator": None, "scaler": None},
+    )
+
+
+def _train_pooled_model(
+    key: tuple,
+    tickers: list[str],
+    universe: str,
+    period: str,
+    interval: str,
+    model_type: str,
+    pre_days: int,
+    ma1: int,
+    ma2: int,
+    ema1: int,
+    feature_flags: dict,
+    progress: Callable[[dict], None] | None,
+) -> dict:
+    X_blocks, y_blocks, used = [], [], []
+    feature_keys = None
+    for n, ticker in enumerate(tickers, start=1):
+        if progress:
+            progress({"stage": "pooled_training", "ticker": n, "tickers": len(tickers)})
+        try:
+            model = _feature_model(ticker, period, interval, model_type, pre_days, ma1, ma2, ema1, feature_flags)
+        except YFRateLimitError:
+            raise
+        except Exception:
+            continue  # tickers without enough history sit this fit out
+        if feature_keys is None:
+            feature_keys = model.feature_keys
+        if model.feature_keys != feature_keys:
+            continue
+        closes = model.real_prices.to_numpy(dtype=float)[model.feature_start - 1:]
+        targets = _horizon_targets(closes, pre_days) / closes[: len(closes) - pre_days, None] - 1.0
+        Z = StandardScaler().fit_transform(model.X)[: len(targets)]
+        rows = np.isfinite(Z).all(axis=1) & np.isfinite(targets).all(axis=1)
+        if rows.any():
+            X_blocks.append(Z[rows])
+            y_blocks.append(targets[rows])
+            used.append(ticker)
+    if len(used) < ML_POOLED_MIN_TICKERS:
+        raise ValueError("Not enough tickers with history to train a pooled model.")
+
+    estimator = _make_direct_model(model_type, 42, n_jobs=ML_TRAINING_THREADS)
+    estimator.fit(_design_matrix(np.vstack(X_blocks), model_type), np.vstack(y_blocks))
+    registry_put(
+        key,
+        universe,
+        estimator,
+        None,
+        {"feature_keys": feature_keys, "tickers": used, "rows": sum(len(block) for block in X_blocks)},
+    )
+    return {"estimator": estimator, "feature_keys": feature_keys, "tickers": used, "created": time.time()}
+
+
+def _pooled_model(
+    period: str,
+    interval: str,
+    model_type: str,
+    pre_days: int,
+    ma1: int,
+    ma2: int,
+    ema1: int,
+    feature_flags: dict,
+    refresh: bool = False,
+    progress: Callable[[dict], None] | None = None,
+    background: bool = False,
+) -> dict:
+    """
+    The pooled estimator for this config, fitted on every ticker of the universe.
+
+    Row t of each ticker is its standardised feature vector and the returns
+    from close t to closes t+1..t+pre_days. Fits are kept in memory and in the
+    model registry for ML_POOLED_TTL; `refresh` refits regardless.
+    """
+    if model_type == "ARIMA":
+        raise ValueError("Pooled models are not available for ARIMA.")
+    tickers = _pooled_universe()
+    if len(tickers) < ML_POOLED_MIN_TICKERS:
+        raise ValueError(
+            f"Pooled models need at least {ML_POOLED_MIN_TICKERS} tickers in the {ML_POOLED_UNIVERSE} universe."
+        )
+    flags = tuple(sorted((k, bool(v)) for k, v in (feature_flags or {}).items()))
+    key = ("pooled", ML_POOLED_UNIVERSE, period, interval, model_type, pre_days, ma1, ma2, ema1, flags)
+    universe = hashlib.sha1(",".join(sorted(tickers)).encode()).hexdigest()
+
+    if not refresh:
+        with _POOLED_LOCK:
+            entry = _POOLED_MODELS.get(key)
+        if entry and entry["universe"] == universe and time.time() - entry["created"] < ML_POOLED_TTL:
+            return entry
+        registered = registry_get(key, universe)
+        if registered and time.time() - registered["meta"]["created"] < ML_POOLED_TTL:
+            entry = {
+                "estimator": registered["estimator"],
+                "feature_keys": registered["meta"]["feature_keys"],
+                "tickers": registered["meta"]["tickers"],
+                "created": registered["meta"]["created"],
+                "universe": universe,
+            }
+            with _POOLED_LOCK:
+                _POOLED_MODELS[key] = entry
+            return entry
+
+    def _train():
+        with training_slot(f"pooled {model_type}", progress=progress, background=background):
+            return _train_pooled_model(
+                key,
+                tickers,
+                universe,
+                period,
+                interval,
+                model_type,
+                pre_days,
+                ma1,
+                ma2,
+                ema1,
+                feature_flags,
+                progress,
+            )
+
+    entry = _singleflight_run(("ml_pooled",) + key, _train) | {"universe": universe}
+    with _POOLED_LOCK:
+        _POOLED_MODELS[key] = entry
+    return entry
+
+
+def _pooled_ignored(test_days: int, scaler_type: str, strategy: str) -> dict:
+    """Requested settings a pooled forecast does not apply, with what it does instead."""
+    ignored = {}
+    if test_days:
+        ignored["test_days"] = "Pooled forecasts are not walk-forward validated."
+    if scaler_type not in ("auto", "standard"):
+        ignored["scaler_type"] = "Pooled models standardise each ticker's features."
+    if strategy != "direct":
+        ignored["strategy"] = "Pooled models always forecast directly."
+    return ignored
+
+
+def _pooled_forecast(
+    cache_key: tuple,
+    ticker: str,
+    period: str,
+    interval: str,
+    model_type: str,
+    pre_days: int,
+    ma1: int,
+    ma2: int,
+    ema1: int,
+    feature_flags: dict,
+    progress: Callable[[dict], None] | None,
+    background: bool,
+    ignored: dict,
+) -> dict:
+    pooled = _pooled_model(
+        period, interval, model_type, pre_days, ma1, ma2, ema1, feature_flags, progress=progress, background=background
+    )
+    model = _feature_model(ticker, period, interval, model_type, pre_days, ma1, ma2, ema1, feature_flags)
+    if model.feature_keys != pooled["feature_keys"]:
+        raise ValueError("Features for this ticker do not match the pooled model.")
+    if progress:
+        progress({"stage": "projection", "step": pre_days, "steps": pre_days})
+
+    # Standardise with the ticker's own history, as in training
+    row = StandardScaler().fit(model.X).transform(model.X[-1:])
+    returns = pooled["estimator"].predict(_design_matrix(row, model_type))[0]
+    last_close = float(model.real_prices.iloc[-1])
+    projected = pd.Series(
+        last_close * (1.0 + np.asarray(returns, dtype=float)),
+        index=_projection_dates(model.real_prices.index, pre_days),
+    )
+    predictions = pd.concat([model.real_prices, projected])
+    payload = {
+        "projected": {
+            "Date": predictions.index.astype(str).tolist(),
+            "Predicted": predictions.tolist(),
+        },
+        "bands": None,
+        "metrics": None,
+        "validation": None,
+        "requested_model": model_type,
+        "model_used": model_type,
+        "auto_retrained": False,
+        "tuned": False,
+        "search": None,
+        "strategy": "direct",
+        "refreshed": None,
+        "budget": None,
+        "pooled": {
+            "universe": ML_POOLED_UNIVERSE,
+            "tickers": len(pooled["tickers"]),
+            "trained": pooled["created"],
+        },
+        "ignored": ignored,
+        "partial": False,
     }
     _cache_set(cache_key, payload)
     return payload
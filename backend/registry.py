@@ -0,0 +1,168 @@
+# backend/registry.py
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from threading import Lock
+
+import joblib
+from xgboost import XGBRegressor
+
+# Fitted estimators persisted across requests, restarts and worker processes.
+# One directory per (ML cache key, training-data fingerprint); least recently
+# used entries are evicted once the registry grows past ML_REGISTRY_MAX_BYTES.
+ML_REGISTRY_DIR = Path(__file__).resolve().parent / "output" / "models"
+ML_REGISTRY_MAX_BYTES = 512 * 1024 * 1024
+
+_META_FILE = "meta.json"
+_SCALER_FILE = "scaler.joblib"
+_ESTIMATOR_JOBLIB = "estimator.joblib"
+_ESTIMATOR_XGB = "estimator.ubj"
+_LATEST_DIR = ".latest"  # key -> fingerprint of its newest entry (dot-prefixed: not an entry)
+
+_REGISTRY_LOCK = Lock()
+
+
+def _entry_id(key: tuple, fingerprint: str) -> str:
+    return hashlib.sha1(repr((key, fingerprint)).encode()).hexdigest()
+
+
+def _key_id(key: tuple) -> str:
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+def _entry_size(path: Path) -> int:
+    total = 0
+    for child in path.iterdir():
+        try:
+            total += child.stat().st_size
+        except FileNotFoundError:
+            pass
+    return total
+
+
+def _remove_entry(path: Path):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def registry_get(key: tuple, fingerprint: str) -> dict | None:
+    """
+    Load the fitted model registered for `key` trained on data `fingerprint`.
+
+    Returns {"estimator", "scaler", "meta"} or None. Unreadable entries are
+    dropped so the next training run replaces them.
+    """
+    path = ML_REGISTRY_DIR / _entry_id(key, fingerprint)
+    meta_path = path / _META_FILE
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text())
+        if meta.get("key") != repr(key) or meta.get("fingerprint") != fingerprint:
+            return None
+        if meta["estimator_format"] == "xgboost":
+            estimator = XGBRegressor()
+            estimator.load_model(path / _ESTIMATOR_XGB)
+        else:
+            estimator = joblib.load(path / _ESTIMATOR_JOBLIB)
+        scaler = joblib.load(path / _SCALER_FILE) if (path / _SCALER_FILE).exists() else None
+        os.utime(meta_path)  # LRU: mtime of meta.json is the last use
+    except Exception:
+        _remove_entry(path)
+        return None
+    return {"estimator": estimator, "scaler": scaler, "meta": meta}
+
+
+def registry_put(key: tuple, fingerprint: str, estimator, scaler, meta: dict):
+    """Persist a fitted estimator (XGBoost native format, joblib otherwise) and its scaler."""
+    ML_REGISTRY_DIR.mkdir(parents=True, exist_ok=True)
+    entry_id = _entry_id(key, fingerprint)
+    tmp = ML_REGISTRY_DIR / f".{entry_id}.{uuid.uuid4().hex}.tmp"
+    try:
+        tmp.mkdir()
+        if isinstance(estimator, XGBRegressor):
+            estimator.save_model(tmp / _ESTIMATOR_XGB)
+            estimator_format = "xgboost"
+        else:
+            joblib.dump(estimator, tmp / _ESTIMATOR_JOBLIB)
+            estimator_format = "joblib"
+        if scaler is not None:
+            joblib.dump(scaler, tmp / _SCALER_FILE)
+        record = meta | {
+            "key": repr(key),
+            "fingerprint": fingerprint,
+            "estimator_format": estimator_format,
+            "created": time.time(),
+        }
+        (tmp / _META_FILE).write_text(json.dumps(record))
+        final = ML_REGISTRY_DIR / entry_id
+        with _REGISTRY_LOCK:
+            _remove_entry(final)
+            # Another worker may publish the same entry concurrently; either copy is valid.
+            try:
+                tmp.rename(final)
+            except OSError:
+                pass
+            _set_latest(key, fingerprint)
+            _evict()
+    except Exception as e:
+        # The registry is an optimisation; a failed write must not fail the request.
+        print(f"Model registry write failed: {e}")
+    finally:
+        _remove_entry(tmp)
+
+
+def _set_latest(key: tuple, fingerprint: str):
+    latest_dir = ML_REGISTRY_DIR / _LATEST_DIR
+    latest_dir.mkdir(exist_ok=True)
+    pointer = latest_dir / f"{_key_id(key)}.json"
+    tmp = latest_dir / f".{pointer.name}.{uuid.uuid4().hex}.tmp"
+    tmp.write_text(json.dumps({"fingerprint": fingerprint}))
+    os.replace(tmp, pointer)
+
+
+def registry_latest(key: tuple) -> dict | None:
+    """The most recently registered fit for `key`, whatever data it was trained on."""
+    pointer = ML_REGISTRY_DIR / _LATEST_DIR / f"{_key_id(key)}.json"
+    try:
+        fingerprint = json.loads(pointer.read_text())["fingerprint"]
+    except Exception:
+        return None
+    return registry_get(key, fingerprint)
+
+
+def _evict():
+    entries = []
+    total = 0
+    for path in ML_REGISTRY_DIR.iterdir():
+        if not path.is_dir() or path.name.startswith("."):
+            continue
+        try:
+            last_used = (path / _META_FILE).stat().st_mtime
+            size = _entry_size(path)
+        except FileNotFoundError:
+            continue
+        entries.append((last_used, size, path))
+        total += size
+    for _last_used, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= ML_REGISTRY_MAX_BYTES:
+            break
+        _remove_entry(path)
+        total -= size
+
+
+def get_registry_stats() -> dict:
+    if not ML_REGISTRY_DIR.exists():
+        return {"entries": 0, "bytes": 0, "max_bytes": ML_REGISTRY_MAX_BYTES}
+    sizes = [
+        _entry_size(path)
+        for path in ML_REGISTRY_DIR.iterdir()
+        if path.is_dir() and not path.name.startswith(".")
+    ]
+    return {"entries": len(sizes), "bytes": sum(sizes), "max_bytes": ML_REGISTRY_MAX_BYTES}
@@ -84,6 +84,9 @@ DEFAULT_SPARKLINE_PROFILE = "1Y"
 # Singleflight queue to coalesce identical Yahoo calls across concurrent requests
 _SF_LOCK = Lock()
 _SF_WAIT: dict[tuple, dict] = {}
+# Per-namespace (first key element) counts of leader runs, coalesced waiters
+# and waiters that gave up on the leader and ran the call themselves
+_SF_STATS: dict[str, dict[str, int]] = {}
 
 def _sf_keyify(v):
     if isinstance(v, dict):
@@ -107,7 +110,33 @@ def _normalize_sparkline_period(value: str | None) -> str:
         return "1Y"
     return DEFAULT_SPARKLINE_PROFILE
 
+def get_singleflight_stats(namespace: str | None = None) -> dict:
+    with _SF_LOCK:
+        if namespace is not None:
+            return dict(_SF_STATS.get(namespace, {"leaders": 0, "coalesced": 0, "fallbacks": 0}))
+        return {name: dict(stats) for name, stats in _SF_STATS.items()}
+
+
 def _singleflight_run(key: tuple, fn, *args, **kwargs):
+    return _singleflight_call(key, fn, args, kwargs)
+
+
+def _singleflight_call(
+    key: tuple,
+    fn,
+    args: tuple = (),
+    kwargs: dict | None = None,
+    wait_timeout: float | None = None,
+    accept=None,
+):
+    """
+    Run `fn(*args, **kwargs)` once for concurrent callers with the same `key`.
+
+    A coalesced caller waits at most `wait_timeout` seconds for the leader, and
+    `accept(result)` may reject the leader's result; either way the caller then
+    runs `fn` itself, outside the flight. Leaders' errors are shared.
+    """
+    kwargs = kwargs or {}
     key = _sf_keyify(key)
     with _SF_LOCK:
         entry = _SF_WAIT.get(key)
@@ -117,6 +146,9 @@ def _singleflight_run(key: tuple, fn, *args, **kwargs):
             leader = True
         else:
             leader = False
+        namespace = str(key[0]) if key else ""
+        stats = _SF_STATS.setdefault(namespace, {"leaders": 0, "coalesced": 0, "fallbacks": 0})
+        stats["leaders" if leader else "coalesced"] += 1
     if leader:
         try:
             res = fn(*args, **kwargs)
@@ -132,13 +164,21 @@ def _singleflight_run(key: tuple, fn, *args, **kwargs):
         if err is not None:
             raise err
         return res
-    else:
-        with entry["cv"]:
-            while not entry["done"]:
-                entry["cv"].wait()
-            if entry["err"] is not None:
-                raise entry["err"]
-            return entry["res"]
+    with entry["cv"]:
+        give_up = None if wait_timeout is None else time.monotonic() + max(0.0, wait_timeout)
+        while not entry["done"]:
+            remaining = None if give_up is None else give_up - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                break
+            entry["cv"].wait(remaining)
+        done, res, err = entry["done"], entry["res"], entry["err"]
+    if done and err is not None:
+        raise err
+    if done and (accept is None or accept(res)):
+        return res
+    with _SF_LOCK:
+        stats["fallbacks"] += 1
+    return fn(*args, **kwargs)
 def convert_numpy_types(d):
     new_d = {}
     for key, lst in d.items():
@@ -108,7 +108,7 @@ export const ML_FEATURES = [
   { key: 'silver_level_pct_ma60', label: 'Silver (% vs MA60)', defaultOn: false },
 ]
 
-export const ML_MODEL_ALLOWLIST = ['XGBoost', 'RandomForest', 'GBR']
+export const ML_MODEL_ALLOWLIST = ['XGBoost', 'RandomForest', 'GBR', 'HistGBR']
 
 export const ML_DAYS = [5, 20, 60, 120]
 
@@ -137,7 +137,7 @@ const mockNews = [
   },
 ]
 
-const mockMlModels = ['XGBoost', 'RandomForest', 'GBR', 'ARIMA']
+const mockMlModels = ['XGBoost', 'RandomForest', 'GBR', 'HistGBR', 'ARIMA']
 
 const mockMlResponse = {
   projected: {
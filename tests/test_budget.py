@@ -0,0 +1,51 @@
+import threading
+
+import pytest
+
+import backend.budget as budget
+
+
+@pytest.fixture(autouse=True)
+def process_slots(monkeypatch):
+    monkeypatch.setattr(budget, "_SLOTS", {"process": 4})
+
+
+@pytest.mark.parametrize("slots", [1, 2, 3, 4, 5, 8])
+@pytest.mark.parametrize("workers", [1, 2, 4])
+def test_split_never_exceeds_the_host_slots(slots, workers):
+    budget.set_training_slots(slots)
+    processes, share = budget.split_training_slots(workers)
+    assert processes <= workers
+    assert budget._SLOTS["process"] >= 1
+    assert budget._SLOTS["process"] + processes * share == slots
+    if processes:
+        assert share >= 1
+
+
+def test_single_slot_is_not_split():
+    budget.set_training_slots(1)
+    assert budget.split_training_slots(2) == (0, 0)
+    assert budget._SLOTS["process"] == 1
+
+
+def test_training_waits_for_this_process_share(monkeypatch):
+    monkeypatch.setattr(budget, "ML_TRAINING_QUEUE_TIMEOUT", 0.1)
+    budget.set_training_slots(1)
+    release = threading.Event()
+    held = threading.Event()
+
+    def _hold():
+        with budget.training_slot("holder"):
+            held.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=_hold)
+    holder.start()
+    held.wait(5)
+    with pytest.raises(budget.TrainingBusy):
+        with budget.training_slot("waiter"):
+            pass
+    release.set()
+    holder.join()
+    with budget.training_slot("after") as slot:
+        assert slot["threads"] == budget.ML_TRAINING_THREADS
@@ -0,0 +1,129 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import backend.jobs as jobs
+
+
+class _BrokenPool:
+    """Stands in for a ProcessPoolExecutor that lost a worker."""
+
+    def __init__(self, *_args, **_kwargs):
+        self.shut_down = False
+
+    def submit(self, *_args, **_kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+class _CrashingPool(_BrokenPool):
+    """Accepts the job, then loses the worker running it."""
+
+    def submit(self, *_args, **_kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+        return future
+
+
+def _params(**overrides):
+    params = dict(
+        ticker="AAA",
+        period="2y",
+        interval="1d",
+        model_type="XGBoost",
+        pre_days=10,
+        test_days=10,
+        ma1=50,
+        ma2=150,
+        ema1=50,
+        arima_order=(5, 1, 0),
+        scaler_type="standard",
+        feature_flags={"rsi": True},
+        use_cache=False,
+    )
+    return params | overrides
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Run jobs on threads with an in-process progress queue."""
+
+    def _fake_run(job_id, params, progress_queue):
+        progress_queue.put((job_id, {"stage": "started"}))
+        return {"partial": False, "ticker": params["ticker"]}
+
+    progress_queue = queue.Queue()
+    threading.Thread(target=jobs._drain_progress, args=(progress_queue,), daemon=True).start()
+    monkeypatch.setattr(jobs, "_run_ml_job", _fake_run)
+    monkeypatch.setattr(jobs, "ProcessPoolExecutor", lambda max_workers, **_kwargs: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(jobs, "_PROGRESS_QUEUE", progress_queue)
+    monkeypatch.setattr(jobs, "_EXECUTOR", None)
+    monkeypatch.setattr(jobs, "_JOB_POOL", (1, 1))
+    monkeypatch.setattr(jobs, "_JOBS", {})
+    monkeypatch.setattr(jobs, "_JOB_KEYS", {})
+    return progress_queue
+
+
+def _wait_finished(job_id: str, timeout: float = 5.0) -> dict:
+    give_up = time.monotonic() + timeout
+    while time.monotonic() < give_up:
+        job = jobs.get_ml_job(job_id)
+        if job["status"] not in jobs.ACTIVE_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_submit_rebuilds_a_broken_pool(pool, monkeypatch):
+    broken = _BrokenPool()
+    monkeypatch.setattr(jobs, "_EXECUTOR", broken)
+    job = jobs.submit_ml_job(_params())
+    assert broken.shut_down
+    assert jobs._EXECUTOR is not broken
+    assert _wait_finished(job["id"])["result"] == {"partial": False, "ticker": "AAA"}
+
+
+def test_failed_submit_rolls_back_the_job(pool, monkeypatch):
+    monkeypatch.setattr(jobs, "ProcessPoolExecutor", _BrokenPool)
+    for _ in range(2):
+        with pytest.raises(jobs.JobPoolUnavailable):
+            jobs.submit_ml_job(_params())
+    assert jobs._JOBS == {}
+    assert jobs._JOB_KEYS == {}
+
+
+def test_job_on_a_crashed_worker_fails_and_is_not_reused(pool, monkeypatch):
+    crashing = _CrashingPool()
+    monkeypatch.setattr(jobs, "_EXECUTOR", crashing)
+    failed = _wait_finished(jobs.submit_ml_job(_params())["id"])
+    assert failed["status"] == "failed"
+    assert crashing.shut_down
+
+    retried = jobs.submit_ml_job(_params())
+    assert retried["id"] != failed["id"]
+    assert "deduplicated" not in retried
+    assert _wait_finished(retried["id"])["status"] == "done"
+
+
+def test_events_stream_ends_with_the_final_status(pool):
+    job = jobs.submit_ml_job(_params())
+
+    async def _collect():
+        return [chunk async for chunk in jobs.iter_ml_job_events(job["id"])]
+
+    chunks = asyncio.run(_collect())
+    assert chunks[-1].startswith("event: done\n")
+
+
+def test_jobs_run_on_threads_without_a_spare_slot(pool, monkeypatch):
+    monkeypatch.setattr(jobs, "_JOB_POOL", (0, 0))
+    job = jobs.submit_ml_job(_params())
+    assert isinstance(jobs._EXECUTOR, ThreadPoolExecutor)
+    assert _wait_finished(job["id"])["status"] == "done"
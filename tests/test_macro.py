@@ -0,0 +1,59 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend.macro as macro
+
+
+def _macro_frame(days: int = 200) -> pd.DataFrame:
+    idx = pd.date_range(end="2024-12-31", periods=days, freq="D")
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(
+        {
+            "sp500_level": 4000 + np.cumsum(rng.normal(0, 10, days)),
+            "sp500_ret": rng.normal(0, 0.01, days),
+        },
+        index=idx,
+    )
+    # Like the cached frame: weekends carry Friday's observation
+    df[df.index.dayofweek >= 5] = np.nan
+    return df.ffill()
+
+
+def test_level_features_carry_levels_over_a_holiday_gap():
+    df = _macro_frame()
+    holiday = df.index[df.index.dayofweek < 5][120]
+    with_gap = df.copy()
+    with_gap.loc[holiday, "sp500_level"] = np.nan
+
+    derived = macro._derive_level_features(with_gap)
+    expected = macro._derive_level_features(df.assign(sp500_level=with_gap["sp500_level"].ffill()))
+    columns = [f"sp500_level_{name}{w}" for w in macro.LEVEL_FEATURE_WINDOWS for name in ("z", "pct_ma")]
+    pd.testing.assert_frame_equal(derived[columns], expected[columns])
+    # The windows spanning the gap keep moving rather than freezing
+    after = derived.loc[holiday:, "sp500_level_z20"].iloc[1:10]
+    assert after.notna().all() and after.nunique() > 1
+
+
+@pytest.mark.parametrize("lag_days", [0, 1, 3])
+def test_extended_alignment_matches_a_full_realignment(monkeypatch, lag_days):
+    frame = _macro_frame()
+    # Gaps the alignment has to forward-fill, including right at the extension
+    frame.iloc[150:153, 0] = np.nan
+    frame.iloc[170:175, 1] = np.nan
+    features = macro._derive_level_features(frame)
+    monkeypatch.setattr(macro, "_MACRO_CACHE", (time.time(), frame, features))
+    monkeypatch.setattr(macro, "_ALIGN_CACHE", OrderedDict())
+
+    # Trading days running a few bars past the end of the macro frame
+    index = pd.bdate_range(start=frame.index[30], periods=140)
+    cut = len(index) - 12
+    macro.align_macro_to_index(index[:cut], lag_days=lag_days)
+    assert macro._find_align_prefix(macro.get_macro_version(), lag_days, index.asi8) is not None
+
+    extended = macro.align_macro_to_index(index, lag_days=lag_days)
+    _, expected = macro._align_frame(features, index, lag_days)
+    pd.testing.assert_frame_equal(extended, expected)
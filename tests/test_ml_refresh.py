@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+import backend.ml as ml
+
+
+def _price_data(n: int = 400):
+    idx = pd.bdate_range(end="2024-12-31", periods=n)
+    rng = np.random.default_rng(7)
+    close = pd.Series(100 + np.cumsum(rng.normal(0.05, 1, n)), index=idx)
+    high = close + rng.uniform(0, 1, n)
+    low = close - rng.uniform(0, 1, n)
+    volume = pd.Series(rng.integers(1e6, 2e6, n).astype(float), index=idx)
+    return close, high, low, volume
+
+
+def _model(price_data, fitted=None):
+    return ml.StockPredictionModel(
+        "AAA",
+        "2y",
+        "1d",
+        pre_days=10,
+        test_days=10,
+        seed=42,
+        feature_flags=dict(ml.DEFAULT_FEATURE_FLAGS),
+        scaler_type="standard",
+        model_type="LinearRegression",
+        zoom=None,
+        start=None,
+        ma1=50,
+        ma2=150,
+        ema1=50,
+        arima_order=(5, 1, 0),
+        price_data=price_data,
+        fitted=fitted,
+    )
+
+
+@pytest.fixture(autouse=True)
+def no_macro(monkeypatch):
+    monkeypatch.setattr(ml, "align_macro_to_index", lambda index, lag_days=1: pd.DataFrame(index=index))
+
+
+def test_rank_one_refresh_matches_a_fresh_fit():
+    new_bars = 5
+    full = _price_data()
+    old = _model(tuple(series.iloc[:-new_bars] for series in full))
+    meta = {"linear_factor": old.linear_factor().tolist()}
+
+    refreshed = _model(full, fitted={"estimator": old.model, "scaler": old.scaler})
+    assert refreshed.refresh_fit(new_bars, meta) == "rank_one_update"
+
+    # The refresh keeps the registered scaler, so the reference fit uses it too.
+    y = full[0].to_numpy(dtype=float)[refreshed.feature_start - 1:]
+    fresh = LinearRegression().fit(refreshed.X_weighted, y)
+    np.testing.assert_allclose(refreshed.model.coef_, fresh.coef_, rtol=1e-8, atol=1e-8)
+    assert refreshed.model.intercept_ == pytest.approx(fresh.intercept_, rel=1e-10)
+    np.testing.assert_allclose(
+        refreshed.model.predict(refreshed.X_weighted), fresh.predict(refreshed.X_weighted), rtol=1e-10
+    )
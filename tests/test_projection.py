@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import backend.ml as ml
+
+STEPS = 8
+
+
+def _price_data(n: int = 400):
+    idx = pd.bdate_range(end="2024-12-31", periods=n)
+    rng = np.random.default_rng(5)
+    close = pd.Series(100 + np.cumsum(rng.normal(0.05, 1, n)), index=idx)
+    high = close + rng.uniform(0, 1, n)
+    low = close - rng.uniform(0, 1, n)
+    volume = pd.Series(rng.integers(1e6, 2e6, n).astype(float), index=idx)
+    return close, high, low, volume
+
+
+def _macro(index, lag_days=1):
+    # Deterministic per date, so aligning any extension of the index is causal
+    dates = pd.DatetimeIndex(index)
+    return pd.DataFrame(
+        {"sp500_ret": np.sin(dates.dayofyear / 10.0), "dgs10": 2 + dates.month / 10.0},
+        index=index,
+    )
+
+
+@pytest.fixture(autouse=True)
+def macro(monkeypatch):
+    monkeypatch.setattr(ml, "align_macro_to_index", _macro)
+
+
+@pytest.mark.parametrize("model_type", ["LinearRegression", "XGBoost"])
+def test_incremental_projection_matches_a_full_recompute(model_type):
+    close, high, low, volume = _price_data()
+    flags = {flag: True for flag in ml.DEFAULT_FEATURE_FLAGS}
+    model = ml.StockPredictionModel(
+        "AAA",
+        "2y",
+        "1d",
+        pre_days=STEPS,
+        test_days=10,
+        seed=42,
+        feature_flags=flags,
+        scaler_type="standard",
+        model_type=model_type,
+        zoom=None,
+        start=None,
+        ma1=50,
+        ma2=150,
+        ema1=50,
+        arima_order=(5, 1, 0),
+        price_data=(close, high, low, volume),
+    )
+    assert {"obv", "macd_signal", "atr", "ma200", "sp500_ret"} <= set(model.feature_keys)
+
+    state = ml.ProjectionState(model, close, high, low, volume, STEPS)
+    high_delta = high.iloc[-1] - close.iloc[-1]
+    low_delta = close.iloc[-1] - low.iloc[-1]
+    row = model.X_weighted[-1]
+    projected = []
+    for step in range(STEPS):
+        prediction = float(model.model.predict([row])[0])
+        raw = state.step(np.array([prediction]))[0]
+        projected.append(prediction)
+
+        dates = state.dates[: step + 1]
+        ext_close = pd.concat([close, pd.Series(projected, index=dates)])
+        ext_high = pd.concat([high, pd.Series(np.array(projected) + high_delta, index=dates)])
+        ext_low = pd.concat([low, pd.Series(np.array(projected) - low_delta, index=dates)])
+        ext_volume = pd.concat([volume, pd.Series(volume.iloc[-1], index=dates)])
+        features = model.evaluate_features(ext_close, ext_high, ext_low, ext_volume)
+        expected = np.array([float(features[key].iloc[-1]) for key in model.feature_keys])
+        np.testing.assert_allclose(raw, expected, rtol=1e-9, atol=1e-9)
+
+        row = model.weight_feature_row(raw)
@@ -0,0 +1,75 @@
+import os
+import time
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+import backend.registry as registry
+
+
+@pytest.fixture(autouse=True)
+def registry_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry, "ML_REGISTRY_DIR", tmp_path)
+    return tmp_path
+
+
+def _estimator(seed: int) -> LinearRegression:
+    rng = np.random.default_rng(seed)
+    return LinearRegression().fit(rng.normal(size=(20, 3)), rng.normal(size=20))
+
+
+def _age(key: tuple, seconds: float):
+    """Backdate an entry's last use."""
+    meta = registry.ML_REGISTRY_DIR / registry._entry_id(key, "fp") / registry._META_FILE
+    stamp = time.time() - seconds
+    os.utime(meta, (stamp, stamp))
+
+
+def test_least_recently_used_entry_is_evicted(monkeypatch):
+    keys = [("AAA", i) for i in range(3)]
+    registry.registry_put(keys[0], "fp", _estimator(0), None, {})
+    entry_bytes = registry.get_registry_stats()["bytes"]
+    monkeypatch.setattr(registry, "ML_REGISTRY_MAX_BYTES", int(entry_bytes * 2.5))
+
+    registry.registry_put(keys[1], "fp", _estimator(1), None, {})
+    _age(keys[0], 20)
+    _age(keys[1], 10)
+    # Reading the oldest entry makes it the most recently used
+    assert registry.registry_get(keys[0], "fp") is not None
+
+    registry.registry_put(keys[2], "fp", _estimator(2), None, {})
+    assert registry.registry_get(keys[1], "fp") is None
+    assert registry.registry_get(keys[0], "fp") is not None
+    assert registry.registry_get(keys[2], "fp") is not None
+    assert registry.get_registry_stats()["entries"] == 2
+
+
+def test_registry_round_trips_the_estimator():
+    estimator = _estimator(3)
+    registry.registry_put(("AAA", 0), "fp", estimator, None, {"note": "x"})
+    entry = registry.registry_get(("AAA", 0), "fp")
+    np.testing.assert_array_equal(entry["estimator"].coef_, estimator.coef_)
+    assert entry["meta"]["note"] == "x"
+    assert registry.registry_latest(("AAA", 0))["meta"]["fingerprint"] == "fp"
+
+
+def test_fingerprint_ignores_disabled_macro_columns(monkeypatch):
+    import pandas as pd
+
+    import backend.ml as ml
+
+    idx = pd.bdate_range(end="2024-12-31", periods=30)
+    prices = pd.Series(np.linspace(100, 110, 30), index=idx)
+    macro = pd.DataFrame({"sp500_ret": np.linspace(0, 1, 30), "dgs10": np.linspace(2, 3, 30)}, index=idx)
+    monkeypatch.setattr(ml, "align_macro_to_index", lambda index, lag_days=1: macro.reindex(index))
+    price_data = (prices, prices + 1, prices - 1, prices * 1000)
+    flags = {"sp500_ret": True, "dgs10": False}
+
+    before = ml._training_fingerprint(price_data, flags)
+    everything = ml._training_fingerprint(price_data)
+    macro.loc[idx[5], "dgs10"] = 9.0  # revision of a column the fit does not read
+    assert ml._training_fingerprint(price_data, flags) == before
+    assert ml._training_fingerprint(price_data) != everything
+    macro.loc[idx[5], "sp500_ret"] = 9.0
+    assert ml._training_fingerprint(price_data, flags) != before
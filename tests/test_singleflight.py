@@ -0,0 +1,112 @@
+import threading
+import time
+
+import backend.ml as ml
+from backend.tools import _singleflight_call, get_singleflight_stats
+
+
+def _start_leader(key, release: threading.Event, result):
+    started = threading.Event()
+
+    def _leader_fn():
+        started.set()
+        release.wait(5)
+        return result
+
+    thread = threading.Thread(target=_singleflight_call, args=(key, _leader_fn))
+    thread.start()
+    started.wait(5)
+    return thread
+
+
+def test_waiter_shares_leader_result():
+    release = threading.Event()
+    key = ("test_share", 1)
+    leader = _start_leader(key, release, {"value": 1})
+    threading.Timer(0.1, release.set).start()
+    assert _singleflight_call(key, lambda: {"value": 2}) == {"value": 1}
+    leader.join()
+    assert get_singleflight_stats("test_share") == {"leaders": 1, "coalesced": 1, "fallbacks": 0}
+
+
+def test_waiter_falls_back_at_its_timeout():
+    release = threading.Event()
+    key = ("test_timeout", 1)
+    leader = _start_leader(key, release, "leader")
+    started = time.monotonic()
+    assert _singleflight_call(key, lambda: "own", wait_timeout=0.2) == "own"
+    assert time.monotonic() - started < 2
+    release.set()
+    leader.join()
+    assert get_singleflight_stats("test_timeout")["fallbacks"] == 1
+
+
+def test_waiter_rejecting_leader_result_runs_itself():
+    release = threading.Event()
+    key = ("test_accept", 1)
+    leader = _start_leader(key, release, {"partial": True})
+    threading.Timer(0.1, release.set).start()
+    result = _singleflight_call(key, lambda: {"partial": False}, accept=lambda payload: not payload["partial"])
+    assert result == {"partial": False}
+    leader.join()
+
+
+def _ml_args(**overrides):
+    args = dict(
+        ticker="AAA",
+        period="2y",
+        interval="1d",
+        model_type="XGBoost",
+        pre_days=10,
+        test_days=10,
+        ma1=50,
+        ma2=150,
+        ema1=50,
+        arima_order=(5, 1, 0),
+        scaler_type="standard",
+        feature_flags={"rsi": True},
+        use_cache=False,
+    )
+    return args | overrides
+
+
+def test_interactive_request_is_not_held_by_background_leader(monkeypatch):
+    release = threading.Event()
+
+    def _fake_train(cache_key, deadline, background, **_kwargs):
+        if background:
+            release.wait(10)
+        return {"partial": False, "background": background}
+
+    monkeypatch.setattr(ml, "_train_and_project", _fake_train)
+    warm = threading.Thread(target=ml.run_ml_model, kwargs=_ml_args(deadline_ms=0, background=True))
+    warm.start()
+    time.sleep(0.1)
+
+    started = time.monotonic()
+    payload = ml.run_ml_model(**_ml_args(deadline_ms=300))
+    assert time.monotonic() - started < 2
+    assert payload == {"partial": False, "background": False}
+    release.set()
+    warm.join()
+
+
+def test_refresh_request_does_not_join_a_cached_run(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def _fake_train(cache_key, use_cache, **_kwargs):
+        calls.append(use_cache)
+        if use_cache:
+            release.wait(10)
+        return {"partial": False, "use_cache": use_cache}
+
+    monkeypatch.setattr(ml, "_train_and_project", _fake_train)
+    monkeypatch.setattr(ml, "_cache_get", lambda key: None)
+    cached = threading.Thread(target=ml.run_ml_model, kwargs=_ml_args(use_cache=True, deadline_ms=0))
+    cached.start()
+    time.sleep(0.1)
+    assert ml.run_ml_model(**_ml_args(use_cache=False, deadline_ms=0)) == {"partial": False, "use_cache": False}
+    release.set()
+    cached.join()
+    assert sorted(calls) == [False, True]
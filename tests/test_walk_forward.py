@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+
+import backend.ml as ml
+
+
+def _series(n: int = 120, k: int = 4):
+    rng = np.random.default_rng(11)
+    X = np.cumsum(rng.normal(size=(n, k)), axis=0) + rng.uniform(10, 100, size=k)
+    y = X @ rng.normal(size=k) + rng.normal(scale=0.5, size=n)
+    return X, y
+
+
+@pytest.mark.parametrize("scaler", [StandardScaler, MinMaxScaler])
+@pytest.mark.parametrize("lag", [0, 4])
+def test_rls_walk_forward_matches_a_refit_per_fold(scaler, lag):
+    X, y = _series()
+    folds = list(range(len(y) - 15, len(y)))
+    preds = ml._linear_walk_forward(X, y, folds, lag=lag)
+
+    assert sorted(preds) == folds
+    for i in folds:
+        fold_scaler = scaler().fit(X[: i - lag])
+        refit = LinearRegression().fit(fold_scaler.transform(X[: i - lag]), y[: i - lag])
+        expected = refit.predict(fold_scaler.transform(X[i : i + 1]))[0]
+        assert preds[i] == pytest.approx(expected, rel=1e-9, abs=1e-9)